@@ -2,8 +2,10 @@
 Page layout analysis combining all detection components.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
 from ..models import TextBox, Rectangle
 from ..extractors import TextExtractor
@@ -12,40 +14,128 @@ from ..renderers import PageRenderer
 from ..postprocessors import PostProcessorPipeline, NMSProcessor, MergeProcessor, FilterProcessor
 
 
-@dataclass
+@dataclass(init=False, eq=False)
 class PageAnalysisResult:
-    """Container for page analysis results."""
+    """
+    Container for page analysis results.
+    
+    Text-to-cell assignments are stored as a flat (cell index, box index)
+    array; the per-cell `cell_text` lists are only built when accessed.
+    Passing `cell_text` directly is still supported.
+    """
     rectangles: List[Rectangle] = field(default_factory=list)
     cells: List[Rectangle] = field(default_factory=list)
-    cell_text: Dict[int, List[TextBox]] = field(default_factory=dict)
     h_lines: List[int] = field(default_factory=list)
     v_lines: List[int] = field(default_factory=list)
     text_boxes: List[TextBox] = field(default_factory=list)
     uncategorized: List[TextBox] = field(default_factory=list)
     dimensions: tuple = (0, 0)
+    cell_box_pairs: np.ndarray = field(default_factory=lambda: np.zeros((0, 2), dtype=np.int32))
+    _cell_text: Optional[Dict[int, List[TextBox]]] = field(default=None, repr=False)
+    
+    def __init__(self, rectangles: Optional[List[Rectangle]] = None,
+                 cells: Optional[List[Rectangle]] = None,
+                 cell_text: Optional[Dict[int, List[TextBox]]] = None,
+                 h_lines: Optional[List[int]] = None,
+                 v_lines: Optional[List[int]] = None,
+                 text_boxes: Optional[List[TextBox]] = None,
+                 uncategorized: Optional[List[TextBox]] = None,
+                 dimensions: tuple = (0, 0),
+                 cell_box_pairs: Optional[np.ndarray] = None):
+        self.rectangles = rectangles if rectangles is not None else []
+        self.cells = cells if cells is not None else []
+        self.h_lines = h_lines if h_lines is not None else []
+        self.v_lines = v_lines if v_lines is not None else []
+        self.text_boxes = text_boxes if text_boxes is not None else []
+        self.uncategorized = uncategorized if uncategorized is not None else []
+        self.dimensions = dimensions
+        self._cell_text = cell_text
+        if cell_box_pairs is None:
+            cell_box_pairs = self._pairs_from_cell_text(cell_text or {}, self.text_boxes)
+        self.cell_box_pairs = cell_box_pairs
+    
+    @staticmethod
+    def _pairs_from_cell_text(cell_text: Dict[int, List[TextBox]],
+                              text_boxes: List[TextBox]) -> np.ndarray:
+        """(cell index, box index) rows for boxes that appear in `text_boxes`."""
+        index = {id(box): j for j, box in enumerate(text_boxes)}
+        pairs = [
+            (i, index[id(box)])
+            for i in sorted(cell_text)
+            for box in cell_text[i]
+            if id(box) in index
+        ]
+        return np.array(pairs, dtype=np.int32).reshape(-1, 2)
     
-    def to_dict(self) -> Dict[str, Any]:
+    @property
+    def cell_text(self) -> Dict[int, List[TextBox]]:
+        """Text boxes inside each cell, keyed by cell index."""
+        if self._cell_text is None:
+            self._cell_text = self._group_cell_text()
+        return self._cell_text
+    
+    def _group_cell_text(self) -> Dict[int, List[TextBox]]:
+        if not self.cells:
+            return {}
+        # Pairs are sorted by cell, so each cell's boxes form one contiguous run
+        counts = np.bincount(self.cell_box_pairs[:, 0], minlength=len(self.cells))
+        groups = np.split(self.cell_box_pairs[:, 1], np.cumsum(counts)[:-1])
         return {
+            i: [self.text_boxes[j] for j in group.tolist()]
+            for i, group in enumerate(groups)
+        }
+    
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.rectangles == other.rectangles and self.cells == other.cells and
+                self.cell_text == other.cell_text and self.h_lines == other.h_lines and
+                self.v_lines == other.v_lines and self.text_boxes == other.text_boxes and
+                self.uncategorized == other.uncategorized and self.dimensions == other.dimensions)
+    
+    def to_dict(self, include_cell_text: bool = True) -> Dict[str, Any]:
+        """
+        Args:
+            include_cell_text: Materialize the per-cell text lists. Callers
+                that only need the geometry can skip building them; the
+                "cell_text" key is then left out.
+        """
+        result = {
             "rectangles": self.rectangles,
             "cells": self.cells,
-            "cell_text": self.cell_text,
-            "h_lines": self.h_lines,
-            "v_lines": self.v_lines,
-            "text_boxes": self.text_boxes,
-            "uncategorized": self.uncategorized,
-            "dimensions": self.dimensions
         }
+        if include_cell_text:
+            result["cell_text"] = self.cell_text
+        result.update(
+            h_lines=self.h_lines,
+            v_lines=self.v_lines,
+            text_boxes=self.text_boxes,
+            uncategorized=self.uncategorized,
+            dimensions=self.dimensions,
+        )
+        return result
 
 
 class PageAnalyzer:
     """Analyzes PDF page layout using all detection components."""
     
-    def __init__(self, dpi: int = 300):
+    def __init__(self, dpi: int = 300, parallel_detectors: bool = False):
+        """
+        Args:
+            dpi: Rendering resolution
+            parallel_detectors: Run the rectangle and table-grid detectors
+                on background threads while text is extracted. OpenCV
+                releases the GIL, so this helps when cores would otherwise
+                sit idle (single-page or single-process conversion); leave
+                it off when pages already run in a process pool.
+        """
         self.dpi = dpi
+        self.parallel_detectors = parallel_detectors
         self.renderer = PageRenderer(dpi)
         self.text_extractor = TextExtractor()
         self.rect_detector = RectangleDetector()
         self.table_detector = TableDetector()
+        self._detector_pool: Optional[ThreadPoolExecutor] = None
         
         # Default post-processing pipeline
         self.pipeline = PostProcessorPipeline([
@@ -54,38 +144,79 @@ class PageAnalyzer:
             FilterProcessor(min_area_ratio=0.01, name="filter")
         ])
     
+    def __getstate__(self):
+        # Thread pools can't be pickled (e.g. into worker processes)
+        state = self.__dict__.copy()
+        state["_detector_pool"] = None
+        return state
+    
+    def close(self):
+        """Shut down the detector threads started by parallel_detectors."""
+        if self._detector_pool is not None:
+            self._detector_pool.shutdown()
+            self._detector_pool = None
+    
     def analyze(self, page) -> PageAnalysisResult:
         """Analyze a PDF page and return structured results."""
         # Render page to image
         image = self.renderer.render(page)
+        return self.analyze_image(image, page)
+    
+    def analyze_image(self, image: np.ndarray, page) -> PageAnalysisResult:
+        """
+        Analyze a page that has already been rendered.
+        
+        Lets callers that need the rendered image themselves (e.g. for
+        debug annotation) avoid rasterizing the page a second time.
+        
+        Args:
+            image: Page rendered at this analyzer's DPI (BGR format)
+            page: PyMuPDF page object the image was rendered from
+        """
         scale = self.renderer.scale
         
-        # Extract text
+        # Start the OpenCV detectors first so they overlap with text extraction
+        if self.parallel_detectors:
+            if self._detector_pool is None:
+                self._detector_pool = ThreadPoolExecutor(max_workers=2)
+            rect_job = self._detector_pool.submit(self.rect_detector.detect, image)
+            grid_job = self._detector_pool.submit(self.table_detector.get_table_structure, image)
+        
+        # Extract text, plus its (x, y, x2, y2) edges as one array shared by
+        # the post-processors and the cell mapping
         text_boxes = self.text_extractor.extract(page, scale)
+        box_coords = np.array([(b.x, b.y, b.x2, b.y2) for b in text_boxes], dtype=np.int64).reshape(-1, 4)
         
         # Detect rectangles
-        rectangles = self.rect_detector.detect(image)
+        if self.parallel_detectors:
+            rectangles = rect_job.result()
+        else:
+            rectangles = self.rect_detector.detect(image)
         
         # Apply post-processing
-        context = {"text_boxes": text_boxes, "dimensions": image.shape[:2][::-1]}
+        context = {
+            "text_boxes": text_boxes,
+            "text_box_coords": box_coords,
+            "dimensions": image.shape[:2][::-1],
+        }
         rectangles = self.pipeline.process(rectangles, context)
         
         # Detect table grid
-        h_lines, v_lines, cells = self.table_detector.get_table_structure(image)
+        if self.parallel_detectors:
+            h_lines, v_lines, cells = grid_job.result()
+        else:
+            h_lines, v_lines, cells = self.table_detector.get_table_structure(image)
         
         # Map text to cells
-        cell_text = {}
-        categorized = []
-        for i, cell in enumerate(cells):
-            cell_text[i] = [b for b in text_boxes if self._box_in_cell(b, cell)]
-            categorized.extend(cell_text[i])
-        
-        uncategorized = [b for b in text_boxes if b not in categorized]
+        mask = self._containment_mask(text_boxes, cells, box_coords)
+        cell_box_pairs = np.argwhere(mask.T).astype(np.int32)
+        in_any_cell = mask.any(axis=1).tolist()
+        uncategorized = [b for b, inside in zip(text_boxes, in_any_cell) if not inside]
         
         return PageAnalysisResult(
             rectangles=rectangles,
             cells=cells,
-            cell_text=cell_text,
+            cell_box_pairs=cell_box_pairs,
             h_lines=h_lines,
             v_lines=v_lines,
             text_boxes=text_boxes,
@@ -93,6 +224,22 @@ class PageAnalyzer:
             dimensions=(image.shape[1], image.shape[0])
         )
     
-    def _box_in_cell(self, box: TextBox, cell: Rectangle) -> bool:
-        return (box.x >= cell.x and box.y >= cell.y and
-                box.x2 <= cell.x2 and box.y2 <= cell.y2)
+    @staticmethod
+    def _containment_mask(boxes: List[TextBox], cells: List[Rectangle],
+                          box_coords: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Boolean (n_boxes, n_cells) mask of boxes fully inside each cell.
+        
+        Computed with broadcasted comparisons instead of a Python loop
+        over every (cell, box) pair. `box_coords` are the boxes' (x, y,
+        x2, y2) rows when the caller already has them.
+        """
+        if not boxes or not cells:
+            return np.zeros((len(boxes), len(cells)), dtype=bool)
+        
+        b = box_coords if box_coords is not None else np.array(
+            [(bx.x, bx.y, bx.x2, bx.y2) for bx in boxes], dtype=np.int64
+        )
+        c = np.array([(cl.x, cl.y, cl.x2, cl.y2) for cl in cells], dtype=np.int64)
+        return ((b[:, 0:1] >= c[:, 0]) & (b[:, 1:2] >= c[:, 1]) &
+                (b[:, 2:3] <= c[:, 2]) & (b[:, 3:4] <= c[:, 3]))
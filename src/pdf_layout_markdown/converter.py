@@ -2,8 +2,13 @@
 Main PDF to Markdown converter using modular components.
 """
 
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Union
 import numpy as np
 
 try:
@@ -11,11 +16,79 @@ try:
 except ImportError:
     fitz = None
 
+from . import __version__
 from .analyzers import PageAnalyzer
 from .generators import MarkdownGenerator, FixedFormatGenerator
 from .renderers import PageRenderer
 from .visualizers import PageAnnotator
 
+# dpi="auto": born-digital pages only need enough resolution for line
+# detection and never render larger than MAX_AUTO_EDGE pixels on their
+# longest side; scanned pages keep full resolution regardless of size
+AUTO_DPI_TEXT = 150
+AUTO_DPI_SCANNED = 300
+MAX_AUTO_EDGE = 2000
+
+# Bump whenever a change to the analyzers or generators alters the
+# markdown they produce, so stale cache entries are not reused
+CACHE_VERSION = 1
+
+# Rendered page images kept for reuse by create_annotated_image (each is
+# tens of MB at 300 DPI, so only the most recent few are held)
+PAGE_IMAGE_CACHE_SIZE = 2
+
+
+def _convert_page(page, analyzer, generator, renderer, annotator, debug_path: Optional[str] = None,
+                  writer: Optional[Executor] = None) -> str:
+    """
+    Analyze a page once, optionally save its debug image, and return its markdown.
+    
+    When `writer` is given the debug image is encoded and written on it,
+    so the caller can move on to the next page in the meantime.
+    """
+    if not debug_path:
+        analysis = analyzer.analyze(page)
+    else:
+        image = renderer.render(page)
+        analysis = analyzer.analyze_image(image, page)
+        annotated = annotator.annotate(
+            image,
+            rectangles=analysis.rectangles,
+            cells=analysis.cells,
+            text_boxes=analysis.text_boxes,
+            h_lines=analysis.h_lines,
+            v_lines=analysis.v_lines
+        )
+        if writer is not None:
+            writer.submit(annotator.save, annotated, debug_path)
+        else:
+            annotator.save(annotated, debug_path)
+    
+    return generator.generate(analysis.text_boxes, context=analysis.to_dict(include_cell_text=False))
+
+
+@lru_cache(maxsize=1)
+def _worker_document(pdf_path: str):
+    """PDF handle kept open for the lifetime of a pool worker."""
+    return fitz.open(pdf_path)
+
+
+def _convert_page_worker(pdf_path: str, components: tuple, page_num: int,
+                         debug_path: Optional[str] = None) -> str:
+    """
+    Process-pool entry point for converting one page.
+    
+    PyMuPDF documents cannot be shared across processes, so each
+    worker opens its own handle to the PDF once and reuses it for
+    every page it is given (pools only live for one convert() call).
+    The analyzer is unpickled afresh for every chunk of tasks and nothing
+    else owns it, so its detector threads are shut down after each page.
+    """
+    try:
+        return _convert_page(_worker_document(pdf_path)[page_num], *components, debug_path)
+    finally:
+        components[0].close()
+
 
 class PDFConverter:
     """
@@ -30,14 +103,21 @@ class PDFConverter:
         converter.save("output.md")
     """
     
-    def __init__(self, pdf_path: str, dpi: int = 300, output_dir: str = "output"):
+    def __init__(self, pdf_path: str, dpi: Union[int, str] = 300, output_dir: str = "output",
+                 use_cache: bool = True, max_workers: Optional[int] = 1):
         """
         Initialize the converter.
         
         Args:
             pdf_path: Path to the PDF file
-            dpi: Rendering DPI (default: 300)
+            dpi: Rendering DPI, or "auto" to pick one from the first page's
+                 content and size (default: 300)
             output_dir: Directory for output files (default: "output")
+            use_cache: Reuse markdown cached under output_dir/.cache for
+                       identical PDF content (default: True)
+            max_workers: Worker processes for multi-page conversion
+                         (default: 1, no pool; None uses os.cpu_count()).
+                         See convert() for the __main__ guard a pool needs
         """
         if fitz is None:
             raise ImportError("PyMuPDF (fitz) is required")
@@ -46,37 +126,103 @@ class PDFConverter:
         if not self.pdf_path.exists():
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
         
-        self.dpi = dpi
+        self.max_workers = max(1, (os.cpu_count() or 1) if max_workers is None else max_workers)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.doc = fitz.open(self.pdf_path)
+        self.dpi = self._auto_dpi() if dpi == "auto" else dpi
+        
+        self.use_cache = use_cache
+        self._fingerprint: Optional[str] = None
         
         # Initialize components
-        self.analyzer = PageAnalyzer(dpi)
-        self.generator = FixedFormatGenerator(dpi)
-        self.renderer = PageRenderer(dpi)
+        self.analyzer = PageAnalyzer(self.dpi)
+        self.generator = FixedFormatGenerator(self.dpi)
+        self.renderer = PageRenderer(self.dpi)
         self.annotator = PageAnnotator()
+        
+        # Per-page analysis results, shared by markdown and debug output
+        self._analysis_cache = {}
+        self._image_cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+    
+    def _auto_dpi(self) -> int:
+        """Choose a rendering DPI from the first page."""
+        if not self.page_count:
+            return AUTO_DPI_SCANNED
+        page = self.doc[0]
+        # Pages without a text layer need the full resolution for their
+        # rulings, so only born-digital pages are reduced
+        if not page.get_text("text").strip():
+            return AUTO_DPI_SCANNED
+        # Pages with a text layer are read natively; the raster only feeds
+        # the line/rectangle detectors, which don't need 300 DPI
+        longest_edge = max(page.rect.width, page.rect.height)
+        return max(1, min(AUTO_DPI_TEXT, int(MAX_AUTO_EDGE * 72 / longest_edge)))
     
     @property
     def page_count(self) -> int:
         """Number of pages in the PDF."""
         return len(self.doc)
     
+    @property
+    def fingerprint(self) -> str:
+        """
+        Content hash of the PDF used as the conversion cache key.
+        
+        Hashing reads the whole file, so it only happens the first time
+        the cache is consulted.
+        """
+        if self._fingerprint is None:
+            with open(self.pdf_path, "rb") as f:
+                self._fingerprint = hashlib.file_digest(f, "blake2b").hexdigest()
+        return self._fingerprint
+    
+    @property
+    def cache_path(self) -> Path:
+        """
+        Location of the cached markdown for this PDF's content and DPI.
+        
+        The name also covers the library and cache format versions and
+        the generator in use, so upgrading or swapping components never
+        returns markdown produced by different code.
+        """
+        config = hashlib.blake2b(
+            f"{__version__}\0{CACHE_VERSION}\0{type(self.generator).__qualname__}".encode("utf-8"),
+            digest_size=8,
+        ).hexdigest()
+        return self.output_dir / ".cache" / f"{self.fingerprint}_{self.dpi}_{config}.md"
+    
     def analyze_page(self, page_num: int = 0):
-        """Analyze a single page."""
-        page = self.doc[page_num]
-        return self.analyzer.analyze(page)
+        """Analyze a single page (cached per page number)."""
+        result = self._analysis_cache.get(page_num)
+        if result is None:
+            result = self.analyzer.analyze_image(self._page_image(page_num), self.doc[page_num])
+            self._analysis_cache[page_num] = result
+        return result
+    
+    def _page_image(self, page_num: int) -> np.ndarray:
+        """Rendered page image, reused from a small most-recently-used cache."""
+        image = self._image_cache.get(page_num)
+        if image is None:
+            image = self.renderer.render(self.doc[page_num])
+            self._image_cache[page_num] = image
+            if len(self._image_cache) > PAGE_IMAGE_CACHE_SIZE:
+                self._image_cache.popitem(last=False)
+        else:
+            self._image_cache.move_to_end(page_num)
+        return image
     
     def generate_markdown(self, page_num: int = 0) -> str:
         """Generate markdown for a single page."""
         analysis = self.analyze_page(page_num)
-        return self.generator.generate(analysis.text_boxes, context=analysis.to_dict())
+        return self.generator.generate(analysis.text_boxes, context=analysis.to_dict(include_cell_text=False))
     
     def create_annotated_image(self, page_num: int = 0, output_path: str = None) -> np.ndarray:
         """Create debug visualization for a page."""
-        page = self.doc[page_num]
-        image = self.renderer.render(page)
-        analysis = self.analyzer.analyze(page)
+        # Shares the rendered image with analyze_page (the annotator draws
+        # on a copy), so the page is rasterized once
+        image = self._page_image(page_num)
+        analysis = self.analyze_page(page_num)
         
         annotated = self.annotator.annotate(
             image,
@@ -92,22 +238,71 @@ class PDFConverter:
         
         return annotated
     
-    def convert(self, create_debug_image: bool = True) -> str:
-        """Convert entire PDF to markdown."""
-        md_parts = []
+    def convert(self, create_debug_image: bool = False) -> str:
+        """
+        Convert entire PDF to markdown.
+        
+        Pages are analyzed in parallel worker processes when max_workers
+        is above 1 and the document has more than one page. A cached
+        result for identical PDF content is returned directly unless debug
+        images are requested, which needs a full analysis.
+        
+        Worker processes are started with "spawn" on macOS and Windows,
+        which re-imports the calling script; with max_workers > 1 the
+        script must run its conversion under `if __name__ == "__main__":`.
+        """
+        if self.use_cache and not create_debug_image:
+            cache_path = self.cache_path
+            if cache_path.exists():
+                return cache_path.read_text(encoding="utf-8")
+        
+        page_nums = range(self.page_count)
+        debug_paths = [
+            str(self.output_dir / f"{self.pdf_path.stem}_page{i+1}_debug.webp")
+            if create_debug_image else None
+            for i in page_nums
+        ]
+        components = (self.analyzer, self.generator, self.renderer, self.annotator)
         
-        for i in range(self.page_count):
-            if create_debug_image:
-                debug_path = self.output_dir / f"{self.pdf_path.stem}_page{i+1}_debug.png"
-                self.create_annotated_image(i, str(debug_path))
-            
+        workers = min(self.max_workers, self.page_count)
+        if workers > 1:
+            worker = partial(_convert_page_worker, str(self.pdf_path), components)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # A few chunks per worker keeps load balanced while
+                # cutting per-page IPC round trips on long documents
+                chunksize = max(1, self.page_count // (workers * 4))
+                pages_md = list(executor.map(worker, page_nums, debug_paths, chunksize=chunksize))
+        elif create_debug_image:
+            # cv2.imwrite releases the GIL, so encoding overlaps the next page's analysis
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                pages_md = [
+                    _convert_page(self.doc[i], *components, debug_paths[i], writer)
+                    for i in page_nums
+                ]
+        else:
+            pages_md = [_convert_page(self.doc[i], *components) for i in page_nums]
+        
+        md_parts = []
+        for i, page_md in enumerate(pages_md):
             md_parts.append(f"--- PAGE {i+1} ---\n\n")
-            md_parts.append(self.generate_markdown(i))
+            md_parts.append(page_md)
             md_parts.append("\n\n")
         
-        return "".join(md_parts)
+        markdown = "".join(md_parts)
+        if self.use_cache:
+            self._write_cache(markdown)
+        
+        return markdown
+    
+    def _write_cache(self, markdown: str):
+        """Atomically store converted markdown in the cache directory."""
+        cache_path = self.cache_path
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(markdown.encode("utf-8"))
+        os.replace(tmp_path, cache_path)
     
-    def save(self, output_path: str = None, create_debug_image: bool = True) -> str:
+    def save(self, output_path: str = None, create_debug_image: bool = False) -> str:
         """Save markdown to file in output directory."""
         if output_path is None:
             output_path = self.output_dir / f"{self.pdf_path.stem}.md"
@@ -119,14 +314,17 @@ class PDFConverter:
         
         markdown = self.convert(create_debug_image)
         
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(markdown)
+        # Encode once and write in a single call (no text-layer chunking
+        # or newline translation)
+        output_path.write_bytes(markdown.encode("utf-8"))
         
         print(f"✅ Saved markdown to: {output_path}")
         return markdown
     
     def close(self):
-        """Close the PDF document."""
+        """Close the PDF document and the analyzer's detector threads."""
+        self.analyzer.close()
+        self._image_cache.clear()
         if self.doc:
             self.doc.close()
     
@@ -0,0 +1,54 @@
+"""
+Per-image memoization of preprocessing shared by the detectors.
+
+RectangleDetector and TableDetector both start from the same page image;
+caching the grayscale conversion, ink threshold and Canny edges on the
+source array lets each be computed once per page. Entries are tied to
+the array's lifetime through a weak reference, so they disappear with
+the page image. Cached arrays must be treated as read-only.
+"""
+
+import weakref
+from typing import Any, Callable, Dict, Tuple
+import cv2
+import numpy as np
+
+from .base import BaseDetector
+
+_entries: Dict[int, Tuple[weakref.ref, Dict[Any, np.ndarray]]] = {}
+
+
+def _memo(array: np.ndarray, key: Any, compute: Callable[[], np.ndarray]) -> np.ndarray:
+    """Return `compute()` cached on `array` under `key`."""
+    array_id = id(array)
+    entry = _entries.get(array_id)
+    if entry is None or entry[0]() is not array:
+        ref = weakref.ref(array, lambda _, array_id=array_id: _entries.pop(array_id, None))
+        entry = _entries[array_id] = (ref, {})
+
+    store = entry[1]
+    result = store.get(key)
+    if result is None:
+        result = store[key] = compute()
+    return result
+
+
+def get_gray(image: np.ndarray, downscale_factor: int = 1) -> np.ndarray:
+    """Grayscale version of a BGR image, optionally downscaled."""
+    return _memo(image, ("gray", downscale_factor), lambda: BaseDetector.downscale(
+        cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), downscale_factor
+    ))
+
+
+def get_binary(gray: np.ndarray, thresh: int = 200) -> np.ndarray:
+    """Inverted binary ink mask (dark pixels become 255)."""
+    return _memo(gray, ("binary", thresh), lambda: cv2.threshold(
+        gray, thresh, 255, cv2.THRESH_BINARY_INV
+    )[1])
+
+
+def get_canny(gray: np.ndarray, low: int = 50, high: int = 150, aperture: int = 3) -> np.ndarray:
+    """Canny edge map of a grayscale image."""
+    return _memo(gray, ("canny", low, high, aperture), lambda: cv2.Canny(
+        gray, low, high, apertureSize=aperture
+    ))
@@ -3,11 +3,30 @@ Base class for layout detectors.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Any, Tuple
+from functools import lru_cache
+import threading
+from typing import List, Any, Tuple, Union
+import cv2
 import numpy as np
 
 from ..models import Rectangle
 
+# downscale_factor="auto": shrink so the longest side of the working image
+# is at most this many pixels
+MAX_ANALYSIS_EDGE = 1600
+
+
+@lru_cache(maxsize=64)
+def rect_kernel(width: int, height: int) -> np.ndarray:
+    """
+    Rectangular structuring element of the given size.
+    
+    Kernel sizes depend only on the page dimensions, so they repeat for
+    every page rendered at the same DPI. The returned array is shared and
+    must not be modified.
+    """
+    return cv2.getStructuringElement(cv2.MORPH_RECT, (width, height))
+
 
 class BaseDetector(ABC):
     """
@@ -17,6 +36,28 @@ class BaseDetector(ABC):
     specific structural elements in document images.
     """
     
+    def __getstate__(self):
+        # Scratch buffers are page-sized; don't ship them to worker processes
+        state = self.__dict__.copy()
+        state.pop("_scratch_buffers", None)
+        return state
+    
+    def scratch(self, name: str, shape: Tuple[int, int]) -> np.ndarray:
+        """
+        Reusable uint8 work buffer for OpenCV `dst=` arguments.
+        
+        Pages rendered at the same DPI have the same size, so one buffer
+        per name serves every page; it is reallocated when the shape
+        changes. Contents are overwritten by the next page. Buffers are
+        per thread, so a detector shared between threads stays safe.
+        """
+        local = self.__dict__.setdefault("_scratch_buffers", threading.local())
+        buffers = local.__dict__.setdefault("buffers", {})
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buffer
+    
     @abstractmethod
     def detect(self, image: np.ndarray) -> List[Rectangle]:
         """
@@ -56,28 +97,66 @@ class BaseDetector(ABC):
         """
         return rectangles
     
+    @staticmethod
+    def _check_downscale(downscale_factor: Union[int, str]) -> Union[int, str]:
+        """Validate a downscale_factor argument (an integer or "auto")."""
+        if downscale_factor == "auto":
+            return downscale_factor
+        return max(1, int(downscale_factor))
+    
+    def analysis_factor(self, shape: Tuple[int, ...]) -> int:
+        """
+        Integer shrink factor used for an image of the given shape.
+        
+        With downscale_factor="auto" it is the smallest factor that brings
+        the longest side down to MAX_ANALYSIS_EDGE pixels.
+        """
+        if self.downscale_factor == "auto":
+            return max(1, -(-max(shape[:2]) // MAX_ANALYSIS_EDGE))
+        return self.downscale_factor
+    
+    @staticmethod
+    def downscale(gray: np.ndarray, factor: int) -> np.ndarray:
+        """
+        Shrink a grayscale image by an integer factor for structural analysis.
+        
+        Each output pixel is the darkest pixel of its factor x factor block,
+        so one-pixel ruling lines keep their full contrast instead of being
+        averaged towards the background.
+        
+        Args:
+            gray: Single-channel image
+            factor: Integer shrink factor (1 returns the image unchanged)
+            
+        Returns:
+            Downscaled image
+        """
+        if factor <= 1:
+            return gray
+        height, width = gray.shape[0] // factor, gray.shape[1] // factor
+        blocks = gray[:height * factor, :width * factor].reshape(height, factor, width, factor)
+        return blocks.min(axis=(1, 3))
+    
     @staticmethod
     def cluster_positions(positions: List[int], threshold: int = 15) -> List[int]:
         """
         Cluster nearby positions into representative values.
         
         Args:
-            positions: List of position values
+            positions: Position values (list or 1-D array)
             threshold: Maximum distance to cluster together
             
         Returns:
             List of clustered representative positions
         """
-        if not positions:
+        if len(positions) == 0:
             return []
         
-        positions = sorted(positions)
-        clusters = [[positions[0]]]
-        
-        for pos in positions[1:]:
-            if pos - clusters[-1][-1] < threshold:
-                clusters[-1].append(pos)
-            else:
-                clusters.append([pos])
+        # A new cluster starts wherever the gap to the previous position
+        # reaches the threshold; reduceat then sums each run in one pass
+        positions = np.sort(np.asarray(positions))
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(positions) >= threshold) + 1))
+        counts = np.diff(np.append(starts, positions.size))
+        means = np.add.reduceat(positions, starts, dtype=np.float64) / counts
         
-        return [int(np.mean(c)) for c in clusters]
+        return means.astype(np.int64).tolist()
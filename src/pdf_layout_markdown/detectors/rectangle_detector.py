@@ -2,11 +2,13 @@
 Rectangle detection using OpenCV contour analysis.
 """
 
-from typing import List, Tuple
+from operator import attrgetter
+from typing import List, Tuple, Union
 import cv2
 import numpy as np
 
-from .base import BaseDetector
+from .base import BaseDetector, rect_kernel
+from ._image_cache import get_gray, get_binary, get_canny
 from ..models import Rectangle
 
 
@@ -25,7 +27,9 @@ class RectangleDetector(BaseDetector):
         min_height_ratio: float = 0.025,
         min_area_ratio: float = 0.02,
         max_area_ratio: float = 0.95,
-        max_aspect_ratio: float = 15.0
+        max_aspect_ratio: float = 15.0,
+        downscale_factor: Union[int, str] = 1,
+        use_canny: bool = False
     ):
         """
         Initialize the rectangle detector.
@@ -36,12 +40,27 @@ class RectangleDetector(BaseDetector):
             min_area_ratio: Minimum area as ratio of page area
             max_area_ratio: Maximum area as ratio of page area
             max_aspect_ratio: Maximum width/height ratio (filters text lines)
+            downscale_factor: Shrink factor applied before line detection
+                              (default 1; 2 quarters the morphology work but
+                              can drop very faint ruling lines); "auto"
+                              picks a factor per image from its size
+            use_canny: Run Canny edge detection for the edge-based method
+                       instead of a plain ink threshold (slower; picks up
+                       rulings lighter than the threshold)
         """
         self.min_width_ratio = min_width_ratio
         self.min_height_ratio = min_height_ratio
         self.min_area_ratio = min_area_ratio
         self.max_area_ratio = max_area_ratio
         self.max_aspect_ratio = max_aspect_ratio
+        self.downscale_factor = self._check_downscale(downscale_factor)
+        self.use_canny = use_canny
+    
+    @staticmethod
+    def _bridge_kernel(factor: int) -> np.ndarray:
+        """Dilation that bridges ~2 full-resolution pixels per iteration."""
+        radius = max(1, round(2 / factor))
+        return rect_kernel(2 * radius + 1, 2 * radius + 1)
     
     def detect(self, image: np.ndarray) -> List[Rectangle]:
         """
@@ -53,10 +72,12 @@ class RectangleDetector(BaseDetector):
         Returns:
             List of detected Rectangle objects
         """
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        f = self.analysis_factor(image.shape)
+        gray = get_gray(image, f)
+        bridge = self._bridge_kernel(f)
         height, width = gray.shape
         
-        # Calculate size thresholds
+        # Calculate size thresholds (at the working resolution)
         min_width = int(width * self.min_width_ratio)
         min_height = int(height * self.min_height_ratio)
         min_area = int(width * height * self.min_area_ratio)
@@ -65,19 +86,24 @@ class RectangleDetector(BaseDetector):
         rectangles = []
         
         # Method 1: Line-based detection (table structures)
-        rects_from_lines = self._detect_from_lines(gray, min_width, min_height, min_area, max_area)
+        rects_from_lines = self._detect_from_lines(gray, min_width, min_height, min_area, max_area, bridge)
         rectangles.extend(rects_from_lines)
         
         # Method 2: Edge-based detection (cleaner structures)
-        rects_from_edges = self._detect_from_edges(gray, min_width, min_height, min_area, max_area)
+        rects_from_edges = self._detect_from_edges(gray, min_width, min_height, min_area, max_area, bridge)
         
         # Add non-duplicate edge-based rectangles
-        for rect in rects_from_edges:
-            if not self._is_duplicate(rect, rectangles):
-                rectangles.append(rect)
+        rectangles.extend(self._drop_duplicates(rects_from_edges, rectangles))
+        
+        # Map back to the input image's coordinates
+        if f > 1:
+            rectangles = [
+                Rectangle(r.x * f, r.y * f, r.width * f, r.height * f, r.level, rect_type=r.rect_type)
+                for r in rectangles
+            ]
         
         # Sort by position (top to bottom, left to right)
-        rectangles.sort(key=lambda r: (r.y, r.x))
+        rectangles.sort(key=attrgetter("y", "x"))
         
         return self.filter_results(rectangles)
     
@@ -87,7 +113,8 @@ class RectangleDetector(BaseDetector):
         min_width: int,
         min_height: int,
         min_area: int,
-        max_area: int
+        max_area: int,
+        bridge_kernel: np.ndarray
     ) -> List[Rectangle]:
         """
         Detect rectangles formed by horizontal and vertical lines.
@@ -96,28 +123,30 @@ class RectangleDetector(BaseDetector):
         rectangles = []
         
         # Threshold to binary (invert: lines become white)
-        _, binary = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
+        binary = get_binary(gray)
         
         # Detect horizontal lines
-        h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (width // 8, 1))
-        h_lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN, h_kernel)
+        h_kernel = rect_kernel(width // 8, 1)
+        h_lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN, h_kernel, dst=self.scratch("h", gray.shape))
         
         # Detect vertical lines
-        v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, height // 8))
-        v_lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN, v_kernel)
+        v_kernel = rect_kernel(1, height // 8)
+        v_lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN, v_kernel, dst=self.scratch("v", gray.shape))
         
-        # Combine lines to find table structure
-        table_structure = cv2.add(h_lines, v_lines)
+        # Combine lines to find table structure (binary masks: OR in place,
+        # no saturating add or new buffer)
+        table_structure = cv2.bitwise_or(h_lines, v_lines, dst=h_lines)
         
-        # Dilate to connect nearby lines
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-        table_structure = cv2.dilate(table_structure, kernel, iterations=2)
+        # Dilate to connect nearby lines (v_lines is free again after the OR)
+        table_structure = cv2.dilate(table_structure, bridge_kernel, dst=v_lines, iterations=2)
         
         # Find contours in the combined structure
         contours, hierarchy = cv2.findContours(
             table_structure, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE
         )
         
+        levels = self._hierarchy_levels(hierarchy, len(contours))
+        
         for i, contour in enumerate(contours):
             x, y, w, h = cv2.boundingRect(contour)
             area = w * h
@@ -126,45 +155,69 @@ class RectangleDetector(BaseDetector):
             if not self._is_valid_size(w, h, area, min_width, min_height, min_area, max_area):
                 continue
             
-            # Get hierarchy level
-            level = 0
-            if hierarchy is not None:
-                parent = hierarchy[0][i][3]
-                while parent != -1:
-                    level += 1
-                    parent = hierarchy[0][parent][3]
-            
-            rectangles.append(Rectangle(x, y, w, h, level, rect_type="line_based"))
+            rectangles.append(Rectangle(x, y, w, h, levels[i], rect_type="line_based"))
         
         return rectangles
     
+    @staticmethod
+    def _hierarchy_levels(hierarchy, count: int) -> List[int]:
+        """
+        Nesting depth of every contour from a RETR_TREE hierarchy.
+        
+        Each parent chain is walked only until it reaches a contour whose
+        depth is already known, so the total work is linear in the
+        number of contours.
+        """
+        if hierarchy is None:
+            return [0] * count
+        
+        parents = hierarchy[0][:, 3].tolist()
+        levels = [-1] * count
+        for i in range(count):
+            chain = []
+            node = i
+            while node != -1 and levels[node] == -1:
+                chain.append(node)
+                node = parents[node]
+            level = levels[node] if node != -1 else -1
+            for node in reversed(chain):
+                level += 1
+                levels[node] = level
+        
+        return levels
+    
     def _detect_from_edges(
         self,
         gray: np.ndarray,
         min_width: int,
         min_height: int,
         min_area: int,
-        max_area: int
+        max_area: int,
+        bridge_kernel: np.ndarray
     ) -> List[Rectangle]:
         """
-        Detect rectangles using edge detection.
+        Detect rectangles from long horizontal/vertical ink runs
+        (or Canny edges when `use_canny` is set).
         """
         height, width = gray.shape
         rectangles = []
         
-        # Edge detection
-        edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+        if self.use_canny:
+            edges = get_canny(gray)
+        else:
+            # Structural rulings only need the binary ink mask (shared with
+            # the line-based method), not fine edges
+            edges = get_binary(gray)
         
         # Use larger kernels for structural lines only
-        h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (width // 5, 1))
-        v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, height // 5))
+        h_kernel = rect_kernel(width // 5, 1)
+        v_kernel = rect_kernel(1, height // 5)
         
-        h_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, h_kernel)
-        v_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, v_kernel)
+        h_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, h_kernel, dst=self.scratch("h", gray.shape))
+        v_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, v_kernel, dst=self.scratch("v", gray.shape))
         
-        table_mask = cv2.add(h_lines, v_lines)
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-        table_mask = cv2.dilate(table_mask, kernel, iterations=3)
+        table_mask = cv2.bitwise_or(h_lines, v_lines, dst=h_lines)
+        table_mask = cv2.dilate(table_mask, bridge_kernel, dst=v_lines, iterations=3)
         
         contours, _ = cv2.findContours(
             table_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
@@ -202,14 +255,43 @@ class RectangleDetector(BaseDetector):
         
         return True
     
-    def _is_duplicate(self, rect: Rectangle, existing: List[Rectangle], threshold: float = 0.5) -> bool:
-        """Check if rectangle significantly overlaps with existing ones."""
-        for existing_rect in existing:
-            overlap_x = max(0, min(rect.x2, existing_rect.x2) - max(rect.x, existing_rect.x))
-            overlap_y = max(0, min(rect.y2, existing_rect.y2) - max(rect.y, existing_rect.y))
-            overlap_area = overlap_x * overlap_y
-            
-            if overlap_area > threshold * min(rect.area, existing_rect.area):
-                return True
+    @staticmethod
+    def _overlap_matrix(a: np.ndarray, b: np.ndarray, threshold: float) -> np.ndarray:
+        """
+        Boolean (len(a), len(b)) mask of pairs whose intersection exceeds
+        `threshold` times the smaller area. Rows are (x, y, x2, y2).
+        """
+        ox = np.maximum(0, np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]))
+        oy = np.maximum(0, np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]))
+        area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+        area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+        return ox * oy > threshold * np.minimum(area_a[:, None], area_b[None, :])
+    
+    def _drop_duplicates(
+        self,
+        candidates: List[Rectangle],
+        existing: List[Rectangle],
+        threshold: float = 0.5
+    ) -> List[Rectangle]:
+        """
+        Return the candidates that don't significantly overlap an existing
+        rectangle or an earlier kept candidate.
+        """
+        if not candidates:
+            return []
+        
+        cand = np.array([(r.x, r.y, r.x2, r.y2) for r in candidates], dtype=np.int64)
+        if existing:
+            exist = np.array([(r.x, r.y, r.x2, r.y2) for r in existing], dtype=np.int64)
+            dup = self._overlap_matrix(cand, exist, threshold).any(axis=1)
+        else:
+            dup = np.zeros(len(candidates), dtype=bool)
+        
+        # Kept candidates also count as existing for later ones
+        cand_overlap = self._overlap_matrix(cand, cand, threshold)
+        kept = []
+        for i in np.flatnonzero(~dup).tolist():
+            if not cand_overlap[i, kept].any():
+                kept.append(i)
         
-        return False
+        return [candidates[i] for i in kept]
@@ -2,11 +2,12 @@
 Table grid detection using OpenCV.
 """
 
-from typing import List, Tuple
+from typing import List, Tuple, Union
 import cv2
 import numpy as np
 
-from .base import BaseDetector
+from .base import BaseDetector, rect_kernel
+from ._image_cache import get_gray, get_canny
 from ..models import Rectangle
 
 
@@ -21,7 +22,9 @@ class TableDetector(BaseDetector):
         min_line_length_ratio: float = 0.1,
         line_threshold: int = 80,
         line_gap: int = 10,
-        cluster_threshold: int = 15
+        cluster_threshold: int = 15,
+        downscale_factor: Union[int, str] = 1,
+        use_cuda: bool = False
     ):
         """
         Initialize the table detector.
@@ -31,11 +34,35 @@ class TableDetector(BaseDetector):
             line_threshold: Hough transform threshold for line detection
             line_gap: Maximum gap between line segments
             cluster_threshold: Distance threshold for clustering nearby lines
+            downscale_factor: Shrink factor applied before morphological line
+                              detection (default 1; 2 quarters the work but
+                              can drop very faint ruling lines); "auto"
+                              picks a factor per image from its size
+            use_cuda: Run Canny and the line morphology on a CUDA device when
+                      OpenCV was built with CUDA and a device is present
+                      (falls back to the CPU otherwise)
         """
         self.min_line_length_ratio = min_line_length_ratio
         self.line_threshold = line_threshold
         self.line_gap = line_gap
         self.cluster_threshold = cluster_threshold
+        self.downscale_factor = self._check_downscale(downscale_factor)
+        self.use_cuda = use_cuda and self._cuda_available()
+        # GPU filters depend on the kernel sizes, so they are built per image shape
+        self._cuda_filters = {}
+    
+    def __getstate__(self):
+        # CUDA filter objects can't be pickled (e.g. into worker processes)
+        state = super().__getstate__()
+        state["_cuda_filters"] = {}
+        return state
+    
+    @staticmethod
+    def _cuda_available() -> bool:
+        try:
+            return cv2.cuda.getCudaEnabledDeviceCount() > 0
+        except (AttributeError, cv2.error):
+            return False
     
     def detect(self, image: np.ndarray) -> List[Rectangle]:
         """
@@ -61,34 +88,82 @@ class TableDetector(BaseDetector):
         Returns:
             Tuple of (horizontal_lines, vertical_lines) as Y and X positions
         """
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        f = self.analysis_factor(image.shape)
+        gray = get_gray(image, f)
+        
+        h_proj = v_proj = None
+        if self.use_cuda:
+            try:
+                h_proj, v_proj = self._grid_projections_cuda(gray)
+            except (cv2.error, AttributeError):
+                # e.g. kernel sizes the device filters don't support, or a
+                # build whose cv2.cuda lacks one of the helpers used
+                self.use_cuda = False
+        if h_proj is None:
+            h_proj, v_proj = self._grid_projections(gray)
+        
+        # Line positions, with row/column centres mapped back to full resolution
+        h_lines = np.flatnonzero(h_proj) * f + f // 2
+        v_lines = np.flatnonzero(v_proj) * f + f // 2
+        
+        # Cluster nearby lines (positions stay arrays until clustered)
+        h_lines = self.cluster_positions(h_lines, self.cluster_threshold)
+        v_lines = self.cluster_positions(v_lines, self.cluster_threshold)
+        
+        return h_lines, v_lines
+    
+    def _grid_projections(self, gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row and column projections of long horizontal/vertical edge runs
+        (non-zero where a line passes).
+        """
         height, width = gray.shape
         
         # Edge detection
-        edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+        edges = get_canny(gray)
         
         # Detect lines using morphological operations
-        h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (width // 8, 1))
-        v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, height // 8))
+        h_kernel = rect_kernel(width // 8, 1)
+        v_kernel = rect_kernel(1, height // 8)
         
-        h_lines_img = cv2.morphologyEx(edges, cv2.MORPH_OPEN, h_kernel)
-        v_lines_img = cv2.morphologyEx(edges, cv2.MORPH_OPEN, v_kernel)
+        # Erosion alone keeps a pixel only where a full kernel-length run
+        # passes through it; the opening's dilate step is not needed since
+        # any surviving run (>= 1/8 of the dimension) already clears the
+        # 10% projection threshold
+        h_lines_img = cv2.erode(edges, h_kernel, dst=self.scratch("h", gray.shape))
+        v_lines_img = cv2.erode(edges, v_kernel, dst=self.scratch("v", gray.shape))
         
-        # Get line positions from projections
-        h_proj = np.sum(h_lines_img, axis=1)
-        v_proj = np.sum(v_lines_img, axis=0)
-        
-        h_threshold = width * 0.1 * 255
-        v_threshold = height * 0.1 * 255
-        
-        h_lines = [i for i, val in enumerate(h_proj) if val > h_threshold]
-        v_lines = [i for i, val in enumerate(v_proj) if val > v_threshold]
+        # A uint8 max-reduce in OpenCV (no wider accumulator)
+        h_proj = cv2.reduce(h_lines_img, 1, cv2.REDUCE_MAX).ravel()
+        v_proj = cv2.reduce(v_lines_img, 0, cv2.REDUCE_MAX).ravel()
+        return h_proj, v_proj
+    
+    def _grid_projections_cuda(self, gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        GPU version of `_grid_projections`.
         
-        # Cluster nearby lines
-        h_lines = self.cluster_positions(h_lines, self.cluster_threshold)
-        v_lines = self.cluster_positions(v_lines, self.cluster_threshold)
+        The page is uploaded once and only the two projection vectors are
+        downloaded; intermediate images stay on the device.
+        """
+        height, width = gray.shape
+        filters = self._cuda_filters.get((height, width))
+        if filters is None:
+            h_kernel = rect_kernel(width // 8, 1)
+            v_kernel = rect_kernel(1, height // 8)
+            filters = (
+                cv2.cuda.createCannyEdgeDetector(50, 150, 3),
+                cv2.cuda.createMorphologyFilter(cv2.MORPH_ERODE, cv2.CV_8UC1, h_kernel),
+                cv2.cuda.createMorphologyFilter(cv2.MORPH_ERODE, cv2.CV_8UC1, v_kernel),
+            )
+            self._cuda_filters[(height, width)] = filters
+        canny, h_erode, v_erode = filters
         
-        return h_lines, v_lines
+        gpu_gray = cv2.cuda_GpuMat()
+        gpu_gray.upload(gray)
+        edges = canny.detect(gpu_gray)
+        h_proj = cv2.cuda.reduce(h_erode.apply(edges), 1, cv2.REDUCE_MAX).download()
+        v_proj = cv2.cuda.reduce(v_erode.apply(edges), 0, cv2.REDUCE_MAX).download()
+        return h_proj.ravel(), v_proj.ravel()
     
     def detect_grid_lines_hough(self, image: np.ndarray) -> Tuple[List[int], List[int]]:
         """
@@ -101,11 +176,11 @@ class TableDetector(BaseDetector):
         Returns:
             Tuple of (horizontal_lines, vertical_lines) as Y and X positions
         """
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = get_gray(image)
         height, width = gray.shape
         
         # Edge detection
-        edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+        edges = get_canny(gray)
         
         # Detect horizontal lines
         h_lines_detected = cv2.HoughLinesP(
@@ -126,19 +201,18 @@ class TableDetector(BaseDetector):
         h_lines = []
         v_lines = []
         
-        # Process horizontal lines
+        # Process horizontal lines: keep nearly horizontal segments (rows
+        # are x1, y1, x2, y2) at their mean Y
         if h_lines_detected is not None:
-            for line in h_lines_detected:
-                x1, y1, x2, y2 = line[0]
-                if abs(y2 - y1) < 5:  # Nearly horizontal
-                    h_lines.append((y1 + y2) // 2)
+            segs = h_lines_detected.reshape(-1, 4)
+            segs = segs[np.abs(segs[:, 3] - segs[:, 1]) < 5]
+            h_lines = (segs[:, 1] + segs[:, 3]) // 2
         
-        # Process vertical lines
+        # Process vertical lines: nearly vertical segments at their mean X
         if v_lines_detected is not None:
-            for line in v_lines_detected:
-                x1, y1, x2, y2 = line[0]
-                if abs(x2 - x1) < 5:  # Nearly vertical
-                    v_lines.append((x1 + x2) // 2)
+            segs = v_lines_detected.reshape(-1, 4)
+            segs = segs[np.abs(segs[:, 2] - segs[:, 0]) < 5]
+            v_lines = (segs[:, 0] + segs[:, 2]) // 2
         
         # Cluster nearby lines
         h_lines = self.cluster_positions(h_lines, self.cluster_threshold)
@@ -173,19 +247,23 @@ class TableDetector(BaseDetector):
         h_lines = self._add_boundaries(h_lines, 0, height, margin=20)
         v_lines = self._add_boundaries(v_lines, 0, width, margin=20)
         
-        # Generate cells from grid intersections
-        for row_idx in range(len(h_lines) - 1):
-            for col_idx in range(len(v_lines) - 1):
-                cell = Rectangle(
-                    x=v_lines[col_idx],
-                    y=h_lines[row_idx],
-                    width=v_lines[col_idx + 1] - v_lines[col_idx],
-                    height=h_lines[row_idx + 1] - h_lines[row_idx],
-                    level=0,
-                    rect_type="table_cell",
-                    metadata={"row": row_idx, "col": col_idx}
-                )
-                cells.append(cell)
+        # Generate cells from grid intersections: row/column spans come
+        # from one diff per axis, then cells are built row-major
+        ys, heights = h_lines[:-1], np.diff(h_lines).tolist()
+        xs, widths = v_lines[:-1], np.diff(v_lines).tolist()
+        cells = [
+            Rectangle(
+                x=x,
+                y=y,
+                width=w,
+                height=h,
+                level=0,
+                rect_type="table_cell",
+                metadata={"row": row_idx, "col": col_idx}
+            )
+            for row_idx, (y, h) in enumerate(zip(ys, heights))
+            for col_idx, (x, w) in enumerate(zip(xs, widths))
+        ]
         
         return cells
     
@@ -197,12 +275,10 @@ class TableDetector(BaseDetector):
         margin: int = 20
     ) -> List[int]:
         """Add boundary lines if they don't exist near the edges."""
-        result = lines.copy()
-        
-        if result[0] > margin:
-            result = [min_val] + result
+        # Build the single copy with the leading boundary already in place
+        result = [min_val, *lines] if lines[0] > margin else list(lines)
         if result[-1] < max_val - margin:
-            result = result + [max_val]
+            result.append(max_val)
         
         return result
     
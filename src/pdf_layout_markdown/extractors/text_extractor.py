@@ -2,7 +2,9 @@
 PDF text extraction using PyMuPDF.
 """
 
-from typing import List, Any
+from operator import attrgetter
+from typing import List, Any, Dict, Optional
+import numpy as np
 
 from .base import BaseExtractor
 from ..models import TextBox
@@ -25,52 +27,57 @@ class TextExtractor(BaseExtractor):
         """
         self.min_text_length = min_text_length
     
-    def extract(self, page: Any, scale: float = 1.0) -> List[TextBox]:
+    def extract(self, page: Any, scale: float = 1.0, dict_data: Optional[Dict] = None) -> List[TextBox]:
         """
         Extract text boxes from a PDF page.
         
         Args:
             page: PyMuPDF page object
             scale: Scaling factor for coordinates (typically DPI/72)
+            dict_data: Already-parsed `page.get_text("dict")` output, so
+                       callers that also need it (e.g. extract_blocks)
+                       parse the page only once
             
         Returns:
             List of TextBox objects with scaled positions
         """
-        boxes = []
-        
         # Get text dictionary with detailed position info
-        dict_data = page.get_text("dict")
+        if dict_data is None:
+            dict_data = page.get_text("dict")
         
-        for block in dict_data.get("blocks", []):
-            # Skip non-text blocks (type 0 is text)
-            if block.get("type") != 0:
-                continue
-            
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    text = span.get("text", "").strip()
-                    
-                    # Skip empty or too short text
-                    if not text or len(text) < self.min_text_length:
-                        continue
-                    
-                    bbox = span.get("bbox", [0, 0, 0, 0])
-                    
-                    box = TextBox(
-                        x=int(bbox[0] * scale),
-                        y=int(bbox[1] * scale),
-                        width=int((bbox[2] - bbox[0]) * scale),
-                        height=int((bbox[3] - bbox[1]) * scale),
-                        text=text,
-                        font_size=span.get("size", 12),
-                        metadata={
-                            "font": span.get("font", ""),
-                            "color": span.get("color", 0),
-                            "flags": span.get("flags", 0),
-                            "origin": span.get("origin", []),
-                        }
-                    )
-                    boxes.append(box)
+        min_len = self.min_text_length
+        # PyMuPDF's dict schema is fixed, so fields are indexed directly;
+        # only text blocks (type 0) carry lines
+        spans = [
+            (span, text)
+            for block in dict_data["blocks"] if block["type"] == 0
+            for line in block["lines"]
+            for span in line["spans"]
+            # Skip empty or too short text
+            if (text := span["text"].strip()) and len(text) >= min_len
+        ]
+        if not spans:
+            return self.postprocess([])
+        
+        # Scale all boxes in one batch: (x, y, width, height) per row
+        bboxes = np.array([span["bbox"] for span, _ in spans], dtype=np.float64)
+        bboxes[:, 2:] -= bboxes[:, :2]
+        geometry = (bboxes * scale).astype(np.int64).tolist()
+        
+        boxes = [
+            TextBox(
+                x=x, y=y, width=w, height=h,
+                text=text,
+                font_size=span["size"],
+                metadata={
+                    "font": span["font"],
+                    "color": span["color"],
+                    "flags": span["flags"],
+                    "origin": span["origin"],
+                }
+            )
+            for (span, text), (x, y, w, h) in zip(spans, geometry)
+        ]
         
         return self.postprocess(boxes)
     
@@ -84,7 +91,7 @@ class TextExtractor(BaseExtractor):
         Returns:
             Sorted text boxes (top to bottom, left to right)
         """
-        return sorted(boxes, key=lambda b: (b.y, b.x))
+        return sorted(boxes, key=attrgetter("y", "x"))
     
     def extract_raw_text(self, page: Any) -> str:
         """
@@ -98,19 +105,22 @@ class TextExtractor(BaseExtractor):
         """
         return page.get_text("text")
     
-    def extract_blocks(self, page: Any, scale: float = 1.0) -> List[List[TextBox]]:
+    def extract_blocks(self, page: Any, scale: float = 1.0,
+                       dict_data: Optional[Dict] = None) -> List[List[TextBox]]:
         """
         Extract text organized by blocks.
         
         Args:
             page: PyMuPDF page object
             scale: Scaling factor for coordinates
+            dict_data: Already-parsed `page.get_text("dict")` output, if available
             
         Returns:
             List of blocks, where each block is a list of TextBox objects
         """
         blocks = []
-        dict_data = page.get_text("dict")
+        if dict_data is None:
+            dict_data = page.get_text("dict")
         
         for block in dict_data.get("blocks", []):
             if block.get("type") != 0:
@@ -5,6 +5,7 @@ Fixed format generator producing output matching the user's specific requirement
 - Semantic Headers
 """
 
+from html import escape
 from typing import List, Dict, Any
 from .structured_markdown_generator import StructuredMarkdownGenerator
 from ..models import TextBox
@@ -25,7 +26,7 @@ class FixedFormatGenerator(StructuredMarkdownGenerator):
         context = context or {}
         rectangles = context.get('rectangles', [])
         
-        self.char_width = self._calculate_char_width(text_boxes)
+        self._start_page(text_boxes)
         
         # Organize content into sections (Header, Body, Footer)
         sections = self._organize_sections(text_boxes, rectangles)
@@ -61,8 +62,7 @@ class FixedFormatGenerator(StructuredMarkdownGenerator):
         
         # Build table rows
         rows = []
-        for line_y in sorted(lines.keys()):
-            line_boxes = sorted(lines[line_y], key=lambda b: b.x)
+        for _, line_boxes in lines:
             row_cells = [box.text.strip() for box in line_boxes]
             rows.append(row_cells)
         
@@ -72,34 +72,29 @@ class FixedFormatGenerator(StructuredMarkdownGenerator):
         # Determine number of columns
         max_cols = max(len(row) for row in rows)
         
-        # Pad rows to have same number of columns
-        for row in rows:
-            while len(row) < max_cols:
-                row.append("")
+        # Escape cell text once and pad rows to the same number of columns
+        rows = [[escape(cell, quote=False) for cell in row] + [""] * (max_cols - len(row))
+                for row in rows]
         
-        # Build HTML table
-        html = ["<table>"]
+        # Build HTML table: first row is the header, the rest are data rows
+        header = "".join(f"      <th>{cell}</th>\n" for cell in rows[0])
+        body = "".join(
+            "    <tr>\n" + "".join(f"      <td>{cell}</td>\n" for cell in row) + "    </tr>\n"
+            for row in rows[1:]
+        )
         
-        # Header row (first row) if we have data
-        if rows:
-            html.append("  <thead>")
-            html.append("    <tr>")
-            for cell in rows[0]:
-                html.append(f"      <th>{cell}</th>")
-            html.append("    </tr>")
-            html.append("  </thead>")
-        
-        # Data rows
-        html.append("  <tbody>")
-        for row in rows[1:]:
-            html.append("    <tr>")
-            for cell in row:
-                html.append(f"      <td>{cell}</td>")
-            html.append("    </tr>")
-        html.append("  </tbody>")
-        html.append("</table>")
-        
-        return "\n".join(html)
+        return (
+            "<table>\n"
+            "  <thead>\n"
+            "    <tr>\n"
+            f"{header}"
+            "    </tr>\n"
+            "  </thead>\n"
+            "  <tbody>\n"
+            f"{body}"
+            "  </tbody>\n"
+            "</table>"
+        )
 
     def _generate_structured_text(self, text_boxes: List[TextBox]) -> str:
         # Use semantic bolding like the base class, maybe enhance if needed
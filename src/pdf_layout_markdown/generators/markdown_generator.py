@@ -2,8 +2,11 @@
 Markdown generator with layout preservation.
 """
 
+from bisect import bisect_right
+from itertools import islice
+from operator import attrgetter
 from typing import List, Dict, Any
-from collections import defaultdict
+import numpy as np
 from .base import BaseGenerator
 from ..models import TextBox
 
@@ -27,7 +30,8 @@ class MarkdownGenerator(BaseGenerator):
             result.append("```")
         
         for line_y in sorted(lines.keys()):
-            line_boxes = sorted(lines[line_y], key=lambda b: b.x)
+            line_boxes = lines[line_y]
+            line_boxes.sort(key=attrgetter("x"))
             line_text = self._build_line(line_boxes, char_width)
             if line_text:
                 result.append(line_text)
@@ -41,36 +45,41 @@ class MarkdownGenerator(BaseGenerator):
         if not boxes:
             return self.dpi / 72 * 7.0
         
-        total_width = sum(b.width for b in boxes[:100] if len(b.text) > 0)
-        total_chars = sum(len(b.text) for b in boxes[:100] if len(b.text) > 0)
+        total_width = total_chars = 0
+        for b in islice(boxes, 100):
+            n = len(b.text)
+            if n:
+                total_width += b.width
+                total_chars += n
         
         return max(total_width / total_chars, 1.0) if total_chars else self.dpi / 72 * 7.0
     
     def _group_into_lines(self, boxes: List[TextBox]) -> Dict[int, List[TextBox]]:
         y_tolerance = int(self.dpi / 72 * 3)
-        lines = defaultdict(list)
+        lines = {}
         
-        for box in boxes:
-            matched = False
-            for line_y in list(lines.keys()):
-                if abs(box.y - line_y) <= y_tolerance:
-                    lines[line_y].append(box)
-                    matched = True
-                    break
-            if not matched:
-                lines[box.y].append(box)
+        # Sweep top to bottom: a line takes every box within tolerance of
+        # its first y, found by bisecting the sorted y values, and the next
+        # box after that starts a new line
+        sorted_boxes = sorted(boxes, key=attrgetter("y"))
+        ys = [box.y for box in sorted_boxes]
+        start = 0
+        while start < len(ys):
+            end = bisect_right(ys, ys[start] + y_tolerance, start + 1)
+            lines[ys[start]] = sorted_boxes[start:end]
+            start = end
         
         return lines
     
     def _build_line(self, boxes: List[TextBox], char_width: float) -> str:
-        chars = []
-        current_x = 0.0
+        if not boxes:
+            return ""
         
-        for box in boxes:
-            gap = box.x - current_x
-            spaces = max(0, int(round(gap / char_width)))
-            chars.append(" " * spaces)
-            chars.append(box.text)
-            current_x = box.x + len(box.text) * char_width
+        # Each box starts after the previous box's estimated text end
+        texts = [box.text for box in boxes]
+        xs = np.fromiter((box.x for box in boxes), dtype=np.float64, count=len(boxes))
+        ends = xs + np.fromiter(map(len, texts), dtype=np.float64, count=len(texts)) * char_width
+        starts = np.concatenate(([0.0], ends[:-1]))
+        spaces = np.maximum(np.round((xs - starts) / char_width), 0).astype(np.int64)
         
-        return "".join(chars).rstrip()
+        return "".join(" " * gap + text for gap, text in zip(spaces.tolist(), texts)).rstrip()
@@ -2,12 +2,23 @@
 Structured markdown generator optimized for LLM understanding.
 """
 
-from typing import List, Dict, Any, Tuple
-from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from operator import attrgetter
+from typing import List, Dict, Any, Optional, Tuple
+import io
 import re
+import numpy as np
 from .base import BaseGenerator
 from ..models import TextBox, Rectangle
 
+# Key-value pairs: "Key : Value" or "Key - Value"
+_KV_RE = re.compile(r'^([A-Z][A-Za-z\s]+?)\s*[:\-]\s*(.+)$')
+
+# Pages with this many boxes or more skip the raw spatial layout block
+# unless the context asks for it with 'include_spatial'
+SPATIAL_LAYOUT_MAX_BOXES = 2000
+
 
 class StructuredMarkdownGenerator(BaseGenerator):
     """
@@ -24,6 +35,23 @@ class StructuredMarkdownGenerator(BaseGenerator):
     def __init__(self, dpi: int = 300):
         self.dpi = dpi
         self.char_width = None
+        self._y_tol = int(dpi / 72 * 3)
+        # id(boxes) -> (boxes, lines); valid for a single generate() call
+        self._lines_cache: Dict[int, Tuple[List[TextBox], List[Tuple[int, List[TextBox]]]]] = {}
+        # id(box) -> (box, "**Key:** value" rendering of colon pairs), filled
+        # by _extract_key_values; valid for a single generate() call
+        self._kv_map: Dict[int, Tuple[TextBox, str]] = {}
+        # id(boxes) -> (boxes, boxes sorted by y, their y values, their X
+        # column buckets) for the page and each section, filled by
+        # _organize_sections; valid for a single generate() call
+        self._projections: Dict[int, Tuple[List[TextBox], List[TextBox], List[int], np.ndarray]] = {}
+    
+    def _start_page(self, text_boxes: List[TextBox]) -> None:
+        """Reset per-call state before generating output for a page."""
+        self.char_width = self._calculate_char_width(text_boxes)
+        self._lines_cache = {}
+        self._kv_map = {}
+        self._projections = {}
     
     def generate(self, text_boxes: List[TextBox], context: Dict[str, Any] = None) -> str:
         """Generate structured markdown from text boxes."""
@@ -33,8 +61,9 @@ class StructuredMarkdownGenerator(BaseGenerator):
         context = context or {}
         rectangles = context.get('rectangles', [])
         cells = context.get('cells', [])
+        include_spatial = context.get('include_spatial', len(text_boxes) < SPATIAL_LAYOUT_MAX_BOXES)
         
-        self.char_width = self._calculate_char_width(text_boxes)
+        self._start_page(text_boxes)
         
         # Organize content into sections
         sections = self._organize_sections(text_boxes, rectangles)
@@ -43,76 +72,68 @@ class StructuredMarkdownGenerator(BaseGenerator):
         key_values = self._extract_key_values(text_boxes)
         
         # Build structured output
-        result = []
+        buf = io.StringIO()
+        w = buf.write
         
         # Add metadata frontmatter
-        result.append("---")
-        result.append("document_type: invoice_or_delivery_order")
+        w("---\n")
+        w("document_type: invoice_or_delivery_order\n")
         if key_values:
-            result.append("key_fields:")
+            w("key_fields:\n")
             for key, value in list(key_values.items())[:10]:  # Top 10 key fields
-                result.append(f"  {key}: {value}")
-        result.append("---")
-        result.append("")
+                w(f"  {key}: {value}\n")
+        w("---\n\n")
         
         # Add main title
-        result.append("# Document Content")
-        result.append("")
+        w("# Document Content\n\n")
         
         # Add sections
         for section_name, section_boxes in sections.items():
             if section_boxes:
-                result.append(f"## {section_name}")
-                result.append("")
+                w(f"## {section_name}\n\n")
                 
                 # Check if this looks like tabular data
                 if self._is_tabular(section_boxes):
-                    table_md = self._generate_table(section_boxes)
-                    result.append(table_md)
+                    w(self._generate_table(section_boxes))
                 else:
                     # Generate as key-value pairs or structured text
-                    structured_text = self._generate_structured_text(section_boxes)
-                    result.append(structured_text)
+                    w(self._generate_structured_text(section_boxes))
                 
-                result.append("")
+                w("\n\n")
         
         # Add raw spatial layout as reference
-        result.append("## Raw Spatial Layout")
-        result.append("")
-        result.append("```")
-        result.append(self._generate_spatial_layout(text_boxes))
-        result.append("```")
-        result.append("")
+        if include_spatial:
+            w("## Raw Spatial Layout\n\n")
+            w("```\n")
+            w(self._generate_spatial_layout(text_boxes))
+            w("\n```\n")
         
-        return "\n".join(result)
+        return buf.getvalue()
     
     def _organize_sections(self, text_boxes: List[TextBox], rectangles: List[Rectangle]) -> Dict[str, List[TextBox]]:
         """Organize text boxes into logical sections."""
         if not text_boxes:
             return {}
         
-        # Sort by Y position
-        sorted_boxes = sorted(text_boxes, key=lambda b: b.y)
-        
-        # Divide into sections based on Y position
-        page_height = max(b.y2 for b in text_boxes) if text_boxes else 1000
-        
-        sections = {
-            "Header": [],
-            "Body": [],
-            "Footer": []
-        }
-        
-        for box in sorted_boxes:
-            # Top 20% = Header
-            if box.y < page_height * 0.2:
-                sections["Header"].append(box)
-            # Bottom 15% = Footer
-            elif box.y > page_height * 0.85:
-                sections["Footer"].append(box)
-            # Middle = Body
-            else:
-                sections["Body"].append(box)
+        # Sort the page by Y once; each section is then a contiguous run
+        # and the line grouping of every section reuses this order
+        order = sorted(text_boxes, key=attrgetter("y"))
+        ys = [box.y for box in order]
+        coords = np.fromiter(((b.y2, b.x) for b in order),
+                             dtype=np.dtype((np.float64, 2)), count=len(order))
+        page_height = coords[:, 0].max()
+        columns = self._column_bucket_ids(coords[:, 1])
+        self._projections[id(text_boxes)] = (text_boxes, order, ys, columns)
+        
+        # Top 20% = Header, bottom 15% = Footer, middle = Body
+        header_end = bisect_left(ys, page_height * 0.2)
+        footer_start = max(bisect_right(ys, page_height * 0.85), header_end)
+        
+        sections = {}
+        for name, lo, hi in (("Header", 0, header_end), ("Body", header_end, footer_start),
+                             ("Footer", footer_start, len(order))):
+            section = sections[name] = order[lo:hi]
+            self._projections[id(section)] = (section, section, ys[lo:hi], columns[lo:hi])
         
         return sections
     
@@ -120,22 +141,20 @@ class StructuredMarkdownGenerator(BaseGenerator):
         """Extract key-value pairs from text boxes."""
         key_values = {}
         
-        # Common patterns for key-value pairs
-        patterns = [
-            r'^([A-Z][A-Za-z\s]+)\s*:\s*(.+)$',  # "Key : Value"
-            r'^([A-Z][A-Za-z\s]+)\s*-\s*(.+)$',  # "Key - Value"
-        ]
-        
         for box in text_boxes:
             text = box.text.strip()
-            for pattern in patterns:
-                match = re.match(pattern, text)
-                if match:
-                    key = match.group(1).strip()
-                    value = match.group(2).strip()
-                    if len(key) < 50 and len(value) < 200:  # Reasonable lengths
-                        key_values[key] = value
-                    break
+            # The pattern cannot match without a separator
+            if ':' not in text and '-' not in text:
+                continue
+            if ':' in text:
+                head, _, tail = text.partition(':')
+                self._kv_map[id(box)] = (box, f"**{head.strip()}:** {tail.strip()}")
+            match = _KV_RE.match(text)
+            if match:
+                key = match.group(1).strip()
+                value = match.group(2).strip()
+                if len(key) < 50 and len(value) < 200:  # Reasonable lengths
+                    key_values[key] = value
         
         return key_values
     
@@ -151,17 +170,33 @@ class StructuredMarkdownGenerator(BaseGenerator):
             return False
         
         # Check if multiple rows have similar X positions (columns)
-        x_positions = defaultdict(int)
-        for line_boxes in lines.values():
-            for box in line_boxes:
-                # Round X to nearest 50 pixels to group columns
-                x_bucket = round(box.x / 50) * 50
-                x_positions[x_bucket] += 1
+        projection = self._projection(text_boxes)
+        if projection is not None:
+            buckets = projection[3]
+        else:
+            buckets = self._column_bucket_ids(
+                np.fromiter((box.x for box in text_boxes), dtype=np.float64, count=len(text_boxes))
+            )
+        counts = np.bincount(buckets - buckets.min())
+        if counts.size < 3:
+            return False
         
         # If we have at least 3 X positions that appear multiple times, it's likely a table
-        repeated_x = sum(1 for count in x_positions.values() if count >= 2)
+        repeated_x = int(np.count_nonzero(counts >= 2))
         return repeated_x >= 3
     
+    def _projection(self, boxes: List[TextBox]) -> Optional[Tuple[List[TextBox], List[TextBox], List[int], np.ndarray]]:
+        """Return the cached projection of `boxes`, or None."""
+        projection = self._projections.get(id(boxes))
+        if projection is not None and projection[0] is boxes:
+            return projection
+        return None
+    
+    @staticmethod
+    def _column_bucket_ids(xs: np.ndarray) -> np.ndarray:
+        """Round X to nearest 50 pixels to group columns."""
+        return np.round(xs / 50).astype(np.int64)
+    
     def _generate_table(self, text_boxes: List[TextBox]) -> str:
         """Generate a markdown table from text boxes."""
         lines = self._group_into_lines(text_boxes)
@@ -169,64 +204,50 @@ class StructuredMarkdownGenerator(BaseGenerator):
         if not lines:
             return ""
         
-        # Build table rows
+        # Build table rows, tracking the number of columns
         rows = []
-        for line_y in sorted(lines.keys()):
-            line_boxes = sorted(lines[line_y], key=lambda b: b.x)
+        max_cols = 0
+        for _, line_boxes in lines:
             row_cells = [box.text.strip() for box in line_boxes]
             rows.append(row_cells)
-        
-        if not rows:
-            return ""
-        
-        # Determine number of columns
-        max_cols = max(len(row) for row in rows)
-        
-        # Pad rows to have same number of columns
-        for row in rows:
-            while len(row) < max_cols:
-                row.append("")
-        
-        # Build markdown table
-        result = []
-        
-        # Header row (first row)
-        if rows:
-            result.append("| " + " | ".join(rows[0]) + " |")
-            result.append("|" + "|".join(["---"] * max_cols) + "|")
-        
-        # Data rows
-        for row in rows[1:]:
-            result.append("| " + " | ".join(row) + " |")
-        
-        return "\n".join(result)
+            if len(row_cells) > max_cols:
+                max_cols = len(row_cells)
+        
+        # Build markdown table: first row is the header, short rows are
+        # padded with empty cells as they are written
+        buf = io.StringIO()
+        w = buf.write
+        for i, row in enumerate(rows):
+            if i:
+                w("\n")
+            w("| " + " | ".join(row) + " | " * (max_cols - len(row)) + " |")
+            if i == 0:
+                w("\n|" + "---|" * max_cols)
+        
+        return buf.getvalue()
     
     def _generate_structured_text(self, text_boxes: List[TextBox]) -> str:
         """Generate structured text with key-value pairs highlighted."""
         lines = self._group_into_lines(text_boxes)
         
         result = []
-        for line_y in sorted(lines.keys()):
-            line_boxes = sorted(lines[line_y], key=lambda b: b.x)
-            
+        for _, line_boxes in lines:
             # Build line text
             line_parts = []
             for box in line_boxes:
-                text = box.text.strip()
-                
-                # Check if it looks like a key-value pair
-                if ':' in text or '-' in text:
-                    # Bold the key part
+                # Reuse the key-value pass when generate() ran it
+                entry = self._kv_map.get(id(box))
+                if entry is not None and entry[0] is box:
+                    part = entry[1]
+                else:
+                    text = box.text.strip()
+                    # Bold the key part of "Key: value" pairs
                     if ':' in text:
-                        parts = text.split(':', 1)
-                        if len(parts) == 2:
-                            line_parts.append(f"**{parts[0].strip()}:** {parts[1].strip()}")
-                        else:
-                            line_parts.append(text)
+                        head, _, tail = text.partition(':')
+                        part = f"**{head.strip()}:** {tail.strip()}"
                     else:
-                        line_parts.append(text)
-                else:
-                    line_parts.append(text)
+                        part = text
+                line_parts.append(part)
             
             if line_parts:
                 result.append("  ".join(line_parts))
@@ -237,52 +258,73 @@ class StructuredMarkdownGenerator(BaseGenerator):
         """Generate spatial layout (original format)."""
         lines = self._group_into_lines(text_boxes)
         
-        result = []
-        for line_y in sorted(lines.keys()):
-            line_boxes = sorted(lines[line_y], key=lambda b: b.x)
-            line_text = self._build_line(line_boxes, self.char_width)
-            if line_text:
-                result.append(line_text)
-        
-        return "\n".join(result)
+        return "\n".join(
+            line_text for line_text in self._build_lines(lines, self.char_width) if line_text
+        )
     
     def _calculate_char_width(self, boxes: List[TextBox]) -> float:
         """Calculate average character width."""
         if not boxes:
             return self.dpi / 72 * 7.0
         
-        total_width = sum(b.width for b in boxes[:100] if len(b.text) > 0)
-        total_chars = sum(len(b.text) for b in boxes[:100] if len(b.text) > 0)
+        total_width = total_chars = 0
+        for b in islice(boxes, 100):
+            n = len(b.text)
+            if n:
+                total_width += b.width
+                total_chars += n
         
         return max(total_width / total_chars, 1.0) if total_chars else self.dpi / 72 * 7.0
     
-    def _group_into_lines(self, boxes: List[TextBox]) -> Dict[int, List[TextBox]]:
-        """Group text boxes into lines based on Y position."""
-        y_tolerance = int(self.dpi / 72 * 3)
-        lines = defaultdict(list)
-        
-        for box in boxes:
-            matched = False
-            for line_y in list(lines.keys()):
-                if abs(box.y - line_y) <= y_tolerance:
-                    lines[line_y].append(box)
-                    matched = True
-                    break
-            if not matched:
-                lines[box.y].append(box)
-        
-        return lines
+    def _group_into_lines(self, boxes: List[TextBox]) -> List[Tuple[int, List[TextBox]]]:
+        """Group text boxes into (y, boxes) lines, top to bottom and left to right."""
+        cached = self._lines_cache.get(id(boxes))
+        if cached is not None and cached[0] is boxes:
+            return cached[1]
+        
+        # Sweep top to bottom: a line takes every box within tolerance of
+        # its first y, found by bisecting the sorted y values, and the next
+        # box after that starts a new line
+        projection = self._projection(boxes)
+        if projection is not None:
+            sorted_boxes, ys = projection[1], projection[2]
+        else:
+            sorted_boxes = sorted(boxes, key=attrgetter("y"))
+            ys = [box.y for box in sorted_boxes]
+        y_tolerance = self._y_tol
+        
+        ordered = []
+        start = 0
+        while start < len(ys):
+            line_y = ys[start]
+            end = bisect_right(ys, line_y + y_tolerance, start + 1)
+            line_boxes = sorted_boxes[start:end]
+            line_boxes.sort(key=attrgetter("x"))
+            ordered.append((line_y, line_boxes))
+            start = end
+        
+        self._lines_cache[id(boxes)] = (boxes, ordered)
+        return ordered
     
     def _build_line(self, boxes: List[TextBox], char_width: float) -> str:
         """Build a line with spatial positioning."""
-        chars = []
-        current_x = 0.0
-        
-        for box in boxes:
-            gap = box.x - current_x
-            spaces = max(0, int(round(gap / char_width)))
-            chars.append(" " * spaces)
-            chars.append(box.text)
-            current_x = box.x + len(box.text) * char_width
-        
-        return "".join(chars).rstrip()
+        return self._build_lines([(0, boxes)], char_width)[0] if boxes else ""
+    
+    def _build_lines(self, lines: List[Tuple[int, List[TextBox]]], char_width: float) -> List[str]:
+        """Build every line with spatial positioning from one page-wide projection."""
+        if not lines:
+            return []
+        
+        # Flatten the page into parallel arrays; each box starts after the
+        # previous box's estimated text end, or at 0 for the first in a line
+        texts = [box.text for _, line_boxes in lines for box in line_boxes]
+        xs = np.fromiter((box.x for _, line_boxes in lines for box in line_boxes),
+                         dtype=np.float64, count=len(texts))
+        ends = xs + np.fromiter(map(len, texts), dtype=np.float64, count=len(texts)) * char_width
+        bounds = np.cumsum([0] + [len(line_boxes) for _, line_boxes in lines])
+        starts = np.concatenate(([0.0], ends[:-1]))
+        starts[bounds[:-1]] = 0.0
+        spaces = np.maximum(np.round((xs - starts) / char_width), 0).astype(np.int64)
+        
+        pieces = [" " * gap + text for gap, text in zip(spaces.tolist(), texts)]
+        return ["".join(pieces[lo:hi]).rstrip() for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
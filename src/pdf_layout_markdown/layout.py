@@ -18,6 +18,7 @@ Approach:
 
 import sys
 from pathlib import Path
+from typing import Optional, Union
 
 # Re-export models for backward compatibility
 from .models import TextBox, Rectangle
@@ -34,12 +35,13 @@ class PDFLayoutAnalyzer:
     For new code, prefer using PDFConverter directly.
     """
     
-    def __init__(self, pdf_path: str, dpi: int = 300):
-        self._converter = PDFConverter(pdf_path, dpi)
+    def __init__(self, pdf_path: str, dpi: Union[int, str] = 300, use_cache: bool = True,
+                 max_workers: Optional[int] = 1):
+        self._converter = PDFConverter(pdf_path, dpi, use_cache=use_cache, max_workers=max_workers)
         self.pdf_path = Path(pdf_path)
         self.doc = self._converter.doc
-        self.dpi = dpi
-        self.zoom = dpi / 72
+        self.dpi = self._converter.dpi
+        self.zoom = self.dpi / 72
     
     def analyze_page(self, page_num: int = 0):
         """Analyze page layout and return structured information."""
@@ -55,11 +57,11 @@ class PDFLayoutAnalyzer:
         """Create annotated image showing detected elements."""
         return self._converter.create_annotated_image(page_num, output_path)
     
-    def convert(self, create_debug_image: bool = True) -> str:
+    def convert(self, create_debug_image: bool = False) -> str:
         """Convert entire PDF to markdown."""
         return self._converter.convert(create_debug_image)
     
-    def save(self, output_path: str = None, create_debug_image: bool = True):
+    def save(self, output_path: str = None, create_debug_image: bool = False):
         """Save markdown to file."""
         return self._converter.save(output_path, create_debug_image)
 
@@ -3,13 +3,14 @@ Rectangle model for detected layout regions.
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, Any, TYPE_CHECKING
+from typing import Dict, Any, Sequence, TYPE_CHECKING
+import numpy as np
 
 if TYPE_CHECKING:
     from .text_box import TextBox
 
 
-@dataclass
+@dataclass(slots=True)
 class Rectangle:
     """
     Represents a detected rectangular region in the document.
@@ -87,6 +88,10 @@ class Rectangle:
         Returns:
             IoU value between 0 and 1
         """
+        # Most pairs don't touch at all; skip the arithmetic for those
+        if self.x2 <= other.x or other.x2 <= self.x or self.y2 <= other.y or other.y2 <= self.y:
+            return 0.0
+        
         x_overlap = max(0, min(self.x2, other.x2) - max(self.x, other.x))
         y_overlap = max(0, min(self.y2, other.y2) - max(self.y, other.y))
         intersection = x_overlap * y_overlap
@@ -94,6 +99,23 @@ class Rectangle:
         union = self.area + other.area - intersection
         return intersection / union if union > 0 else 0
     
+    @staticmethod
+    def pairwise_iou(rects: Sequence["Rectangle"]) -> np.ndarray:
+        """
+        IoU of every pair of rectangles at once.
+        
+        Returns:
+            Float (N, N) matrix; entry [i, j] equals
+            rects[i].compute_iou(rects[j])
+        """
+        c = np.array([(r.x, r.y, r.x2, r.y2) for r in rects], dtype=np.int64).reshape(-1, 4)
+        x_overlap = np.maximum(0, np.minimum(c[:, None, 2], c[None, :, 2]) - np.maximum(c[:, None, 0], c[None, :, 0]))
+        y_overlap = np.maximum(0, np.minimum(c[:, None, 3], c[None, :, 3]) - np.maximum(c[:, None, 1], c[None, :, 1]))
+        intersection = x_overlap * y_overlap
+        areas = (c[:, 2] - c[:, 0]) * (c[:, 3] - c[:, 1])
+        union = areas[:, None] + areas[None, :] - intersection
+        return np.divide(intersection, union, out=np.zeros(union.shape), where=union > 0)
+    
     def merge_with(self, other: "Rectangle") -> "Rectangle":
         """
         Create a new rectangle that encompasses both rectangles.
@@ -6,7 +6,7 @@ from dataclasses import dataclass, field
 from typing import Optional, Dict, Any
 
 
-@dataclass
+@dataclass(slots=True)
 class TextBox:
     """
     Represents a text element with its bounding box position.
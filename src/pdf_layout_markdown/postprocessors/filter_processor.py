@@ -3,6 +3,7 @@ Filter post-processor for removing invalid rectangles.
 """
 
 from typing import List, Any, Dict
+import numpy as np
 from .base import BasePostProcessor
 from ..models import Rectangle
 
@@ -31,12 +32,9 @@ class FilterProcessor(BasePostProcessor):
                 page_area = dims[0] * dims[1]
                 min_area = int(page_area * self.min_area_ratio)
         
-        filtered = []
-        for rect in items:
-            if rect.area < min_area:
-                continue
-            if max_area and rect.area > max_area:
-                continue
-            filtered.append(rect)
+        areas = np.fromiter((r.width * r.height for r in items), dtype=np.int64, count=len(items))
+        keep = areas >= min_area
+        if max_area:
+            keep &= areas <= max_area
         
-        return filtered
+        return [items[i] for i in np.flatnonzero(keep).tolist()]
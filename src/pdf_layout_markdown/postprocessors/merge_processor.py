@@ -2,7 +2,8 @@
 Merge nearby rectangles post-processor.
 """
 
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Optional
+import numpy as np
 from .base import BasePostProcessor
 from ..models import Rectangle, TextBox
 
@@ -19,64 +20,95 @@ class MergeProcessor(BasePostProcessor):
         if not items:
             return []
         
-        text_boxes = context.get("text_boxes", []) if context else []
+        context = context or {}
+        text_boxes = context.get("text_boxes", [])
         
         # Expand rectangles to include nearby text
-        expanded = self._expand_with_text(items, text_boxes)
+        expanded = self._expand_with_text(items, text_boxes, context.get("text_box_coords"))
         
         # Merge nearby rectangles
         return self._merge_nearby(expanded)
     
-    def _expand_with_text(self, rects: List[Rectangle], boxes: List[TextBox]) -> List[Rectangle]:
+    def _expand_with_text(self, rects: List[Rectangle], boxes: List[TextBox],
+                          box_coords: Optional[np.ndarray] = None) -> List[Rectangle]:
+        if not boxes:
+            return list(rects)
+        
+        # Text box edges as columns (x, y, x2, y2), built once for all rects
+        # unless the caller already has them
+        tb = box_coords if box_coords is not None else np.array(
+            [(b.x, b.y, b.x2, b.y2) for b in boxes], dtype=np.int64
+        )
+        pad = self.padding
+        
         expanded = []
         for rect in rects:
-            related = [b for b in boxes if self._is_related(b, rect)]
-            if related:
-                min_x = min(min(b.x for b in related), rect.x) - self.padding
-                min_y = min(min(b.y for b in related), rect.y) - self.padding
-                max_x = max(max(b.x2 for b in related), rect.x2) + self.padding
-                max_y = max(max(b.y2 for b in related), rect.y2) + self.padding
+            related = ((tb[:, 0] >= rect.x - pad) & (tb[:, 2] <= rect.x2 + pad) &
+                       (tb[:, 1] >= rect.y - pad) & (tb[:, 3] <= rect.y2 + pad))
+            if related.any():
+                lo = tb[related, :2].min(axis=0)
+                hi = tb[related, 2:].max(axis=0)
+                min_x = min(int(lo[0]), rect.x) - pad
+                min_y = min(int(lo[1]), rect.y) - pad
+                max_x = max(int(hi[0]), rect.x2) + pad
+                max_y = max(int(hi[1]), rect.y2) + pad
                 expanded.append(Rectangle(int(min_x), int(min_y), int(max_x - min_x), int(max_y - min_y), rect.level))
             else:
                 expanded.append(rect)
         return expanded
     
-    def _is_related(self, box: TextBox, rect: Rectangle) -> bool:
-        return (box.x >= rect.x - self.padding and box.x2 <= rect.x2 + self.padding and
-                box.y >= rect.y - self.padding and box.y2 <= rect.y2 + self.padding)
-    
     def _merge_nearby(self, rects: List[Rectangle]) -> List[Rectangle]:
-        merged = []
-        used = set()
+        if not rects:
+            return []
+        
+        coords = np.array([(r.x, r.y, r.x2, r.y2) for r in rects], dtype=np.int64)
+        should_merge = self._merge_matrix(coords, self.max_gap)
         
-        for i, rect1 in enumerate(rects):
-            if i in used:
-                continue
-            
-            group = [rect1]
-            for j, rect2 in enumerate(rects):
-                if i == j or j in used:
-                    continue
-                if self._should_merge(rect1, rect2):
-                    group.append(rect2)
-                    used.add(j)
-            
-            min_x = min(r.x for r in group)
-            min_y = min(r.y for r in group)
-            max_x = max(r.x2 for r in group)
-            max_y = max(r.y2 for r in group)
-            merged.append(Rectangle(min_x, min_y, max_x - min_x, max_y - min_y, rect1.level))
+        # Union-find over the merge pairs, so chains of nearby rectangles
+        # end up in one group
+        parent = list(range(len(rects)))
+        
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        for i, j in np.argwhere(np.triu(should_merge, k=1)).tolist():
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                # Keep the lowest index as root so groups stay in input order
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+        
+        roots = np.fromiter((find(i) for i in range(len(rects))), dtype=np.int64, count=len(rects))
+        
+        merged = []
+        for root in np.unique(roots).tolist():
+            members = roots == root
+            min_x, min_y = coords[members, :2].min(axis=0).tolist()
+            max_x, max_y = coords[members, 2:].max(axis=0).tolist()
+            merged.append(Rectangle(min_x, min_y, max_x - min_x, max_y - min_y, rects[root].level))
         
         return merged
     
-    def _should_merge(self, r1: Rectangle, r2: Rectangle) -> bool:
-        h_gap = max(r1.x, r2.x) - min(r1.x2, r2.x2)
-        v_gap = max(r1.y, r2.y) - min(r1.y2, r2.y2)
-        x_overlap = min(r1.x2, r2.x2) - max(r1.x, r2.x)
-        y_overlap = min(r1.y2, r2.y2) - max(r1.y, r2.y)
+    @staticmethod
+    def _merge_matrix(coords: np.ndarray, max_gap: int) -> np.ndarray:
+        """
+        Boolean (N, N) matrix of rectangle pairs that should merge.
         
-        if x_overlap > min(r1.width, r2.width) * 0.5 and v_gap < self.max_gap:
-            return True
-        if y_overlap > min(r1.height, r2.height) * 0.5 and h_gap < self.max_gap:
-            return True
-        return False
+        Two rectangles merge when they overlap horizontally by more than
+        half the narrower width and their vertical gap is below
+        `max_gap` (stacked), or they overlap vertically by more than half
+        the shorter height and their horizontal gap is below `max_gap`
+        (side by side). Rows of `coords` are (x, y, x2, y2).
+        """
+        x1, y1, x2, y2 = coords.T
+        width, height = x2 - x1, y2 - y1
+        h_gap = np.maximum(x1[:, None], x1[None, :]) - np.minimum(x2[:, None], x2[None, :])
+        v_gap = np.maximum(y1[:, None], y1[None, :]) - np.minimum(y2[:, None], y2[None, :])
+        # Overlap along an axis is the negated gap
+        x_overlap, y_overlap = -h_gap, -v_gap
+        return (
+            ((x_overlap > np.minimum(width[:, None], width[None, :]) * 0.5) & (v_gap < max_gap)) |
+            ((y_overlap > np.minimum(height[:, None], height[None, :]) * 0.5) & (h_gap < max_gap))
+        )
@@ -2,7 +2,9 @@
 Non-Maximum Suppression (NMS) post-processor.
 """
 
+from operator import attrgetter
 from typing import List, Any, Dict
+import numpy as np
 from .base import BasePostProcessor
 from ..models import Rectangle
 
@@ -18,19 +20,23 @@ class NMSProcessor(BasePostProcessor):
         if not items:
             return []
         
-        sorted_rects = sorted(items, key=lambda r: r.area, reverse=True)
-        keep = []
+        sorted_rects = sorted(items, key=attrgetter("area"), reverse=True)
+        boxes = np.array([(r.x, r.y, r.x2, r.y2) for r in sorted_rects], dtype=np.int64)
+        
+        # overlaps[i, j]: rectangle i overlaps j above the threshold or
+        # fully contains it
+        contains = ((boxes[None, :, 0] >= boxes[:, None, 0]) & (boxes[None, :, 1] >= boxes[:, None, 1]) &
+                    (boxes[None, :, 2] <= boxes[:, None, 2]) & (boxes[None, :, 3] <= boxes[:, None, 3]))
+        overlaps = (Rectangle.pairwise_iou(sorted_rects) > self.iou_threshold) | contains
         
-        for rect in sorted_rects:
-            should_keep = True
-            for kept_rect in keep:
-                if rect.compute_iou(kept_rect) > self.iou_threshold:
-                    should_keep = False
-                    break
-                if kept_rect.contains_rectangle(rect):
-                    should_keep = False
-                    break
-            if should_keep:
-                keep.append(rect)
+        # Greedy NMS: each kept rectangle suppresses every later (smaller)
+        # one it overlaps
+        suppressed = np.zeros(len(sorted_rects), dtype=bool)
+        keep = []
+        for i, rect in enumerate(sorted_rects):
+            if suppressed[i]:
+                continue
+            keep.append(rect)
+            suppressed[i + 1:] |= overlaps[i, i + 1:]
         
         return keep
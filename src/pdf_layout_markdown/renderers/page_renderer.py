@@ -50,20 +50,31 @@ class PageRenderer:
         """
         mat = fitz.Matrix(self.zoom, self.zoom)
         pix = page.get_pixmap(matrix=mat, alpha=False)
-        
-        # Convert to numpy array
-        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
-            pix.height, pix.width, pix.n
-        )
+        img = self._pixmap_view(pix)
         
         # Convert to BGR for OpenCV
         if pix.n == 3:
             img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
         elif pix.n == 4:
             img = cv2.cvtColor(img, cv2.COLOR_RGBA2BGR)
+        else:
+            img = img.copy()
         
         return img
     
+    @staticmethod
+    def _pixmap_view(pix) -> np.ndarray:
+        """
+        (height, width, n) view of a pixmap's samples without copying them.
+        
+        `pix.samples` copies the whole raster into a bytes object; the
+        memoryview doesn't. The view is only valid while `pix` is alive,
+        so callers must convert or copy it before returning.
+        """
+        return np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(
+            pix.height, pix.width, pix.n
+        )
+    
     def render_with_alpha(self, page) -> np.ndarray:
         """
         Render a PDF page with alpha channel.
@@ -76,13 +87,12 @@ class PageRenderer:
         """
         mat = fitz.Matrix(self.zoom, self.zoom)
         pix = page.get_pixmap(matrix=mat, alpha=True)
-        
-        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
-            pix.height, pix.width, pix.n
-        )
+        img = self._pixmap_view(pix)
         
         if pix.n == 4:
             img = cv2.cvtColor(img, cv2.COLOR_RGBA2BGRA)
+        else:
+            img = img.copy()
         
         return img
     
@@ -124,12 +134,11 @@ class PageRenderer:
         
         mat = fitz.Matrix(self.zoom, self.zoom)
         pix = page.get_pixmap(matrix=mat, clip=clip, alpha=False)
-        
-        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
-            pix.height, pix.width, pix.n
-        )
+        img = self._pixmap_view(pix)
         
         if pix.n == 3:
             img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+        else:
+            img = img.copy()
         
         return img
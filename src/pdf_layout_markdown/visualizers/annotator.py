@@ -65,7 +65,8 @@ class PageAnnotator:
         for x in lines:
             cv2.line(img, (x, 0), (x, img.shape[0]), color, 1)
     
-    def save(self, image: np.ndarray, path: str):
-        """Save annotated image to file."""
-        cv2.imwrite(path, image)
+    def save(self, image: np.ndarray, path: str, webp_quality: int = 80):
+        """Save annotated image to file (lossy when the path ends in .webp)."""
+        params = [cv2.IMWRITE_WEBP_QUALITY, webp_quality] if path.lower().endswith(".webp") else []
+        cv2.imwrite(path, image, params)
         print(f"✅ Annotated image saved: {path}")
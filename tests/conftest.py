@@ -0,0 +1,28 @@
+"""
+Shared fixtures: small PDFs generated on the fly with PyMuPDF.
+"""
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    """Two-page PDF with a ruled 3x3 table and some free text."""
+    path = tmp_path / "sample.pdf"
+    doc = fitz.open()
+    for page_num in range(2):
+        page = doc.new_page(width=612, height=792)
+        page.insert_text((72, 72), f"Invoice No: {page_num + 1}", fontsize=12)
+        page.insert_text((72, 100), "Consignee: ACME & Sons <Ltd>", fontsize=10)
+        x0, y0, cell_w, cell_h = 72, 150, 150, 50
+        for i in range(4):
+            page.draw_line((x0, y0 + i * cell_h), (x0 + 3 * cell_w, y0 + i * cell_h), width=1)
+            page.draw_line((x0 + i * cell_w, y0), (x0 + i * cell_w, y0 + 3 * cell_h), width=1)
+        for r in range(3):
+            for c in range(3):
+                page.insert_text((x0 + c * cell_w + 5, y0 + r * cell_h + 30), f"R{r}C{c}", fontsize=10)
+    doc.save(path)
+    doc.close()
+    return path
@@ -0,0 +1,33 @@
+"""
+Tests for PDFConverter's automatic DPI selection.
+"""
+
+import fitz
+import pytest
+
+from pdf_layout_markdown import PDFConverter
+from pdf_layout_markdown.converter import AUTO_DPI_SCANNED, AUTO_DPI_TEXT, MAX_AUTO_EDGE
+
+
+def _pdf(tmp_path, width, height, text=None):
+    path = tmp_path / "page.pdf"
+    with fitz.open() as doc:
+        page = doc.new_page(width=width, height=height)
+        if text:
+            page.insert_text((72, 72), text)
+        doc.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("width, height", [(612, 792), (2384, 3370)])
+def test_scanned_pages_keep_full_resolution(tmp_path, width, height):
+    with PDFConverter(_pdf(tmp_path, width, height), dpi="auto", output_dir=str(tmp_path / "out")) as conv:
+        assert conv.dpi == AUTO_DPI_SCANNED
+
+
+def test_text_pages_are_capped_by_edge(tmp_path):
+    with PDFConverter(_pdf(tmp_path, 612, 792, "Invoice"), dpi="auto", output_dir=str(tmp_path / "out")) as conv:
+        assert conv.dpi == AUTO_DPI_TEXT
+    
+    with PDFConverter(_pdf(tmp_path, 2384, 3370, "Invoice"), dpi="auto", output_dir=str(tmp_path / "out")) as conv:
+        assert conv.dpi == MAX_AUTO_EDGE * 72 // 3370
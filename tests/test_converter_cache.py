@@ -0,0 +1,76 @@
+"""
+Tests for PDFConverter's content-hash markdown cache.
+"""
+
+from pdf_layout_markdown import PDFConverter, PDFLayoutAnalyzer, converter as converter_module
+from pdf_layout_markdown.generators import MarkdownGenerator
+
+
+def _converter(pdf, tmp_path, **kwargs):
+    return PDFConverter(str(pdf), dpi=100, output_dir=str(tmp_path / "out"), max_workers=1, **kwargs)
+
+
+def test_cache_hit_returns_stored_markdown(sample_pdf, tmp_path):
+    with _converter(sample_pdf, tmp_path) as conv:
+        markdown = conv.convert()
+        assert conv.cache_path.read_text(encoding="utf-8") == markdown
+        conv.cache_path.write_text("cached", encoding="utf-8")
+        assert conv.convert() == "cached"
+
+
+def test_use_cache_false_reconverts_and_leaves_cache_alone(sample_pdf, tmp_path):
+    with _converter(sample_pdf, tmp_path) as conv:
+        markdown = conv.convert()
+        conv.cache_path.write_text("stale", encoding="utf-8")
+    
+    with _converter(sample_pdf, tmp_path, use_cache=False) as conv:
+        assert conv.convert() == markdown
+        assert conv.cache_path.read_text(encoding="utf-8") == "stale"
+
+
+def test_layout_analyzer_forwards_use_cache(sample_pdf, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    analyzer = PDFLayoutAnalyzer(str(sample_pdf), dpi=100, use_cache=False)
+    assert analyzer._converter.use_cache is False
+    analyzer._converter.cache_path.parent.mkdir(parents=True)
+    analyzer._converter.cache_path.write_text("stale", encoding="utf-8")
+    assert analyzer.convert() != "stale"
+
+
+def test_cache_key_covers_version_and_generator(sample_pdf, tmp_path, monkeypatch):
+    with _converter(sample_pdf, tmp_path) as conv:
+        path = conv.cache_path
+        
+        monkeypatch.setattr(converter_module, "CACHE_VERSION", converter_module.CACHE_VERSION + 1)
+        assert conv.cache_path != path
+        monkeypatch.undo()
+        assert conv.cache_path == path
+        
+        conv.generator = MarkdownGenerator(conv.dpi)
+        assert conv.cache_path != path
+
+
+def test_process_pool_is_opt_in(sample_pdf, tmp_path, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("convert() started a process pool")
+    
+    with PDFConverter(str(sample_pdf), dpi=100, output_dir=str(tmp_path / "out"), use_cache=False) as conv:
+        assert conv.max_workers == 1
+        with monkeypatch.context() as m:
+            m.setattr(converter_module, "ProcessPoolExecutor", no_pool)
+            markdown = conv.convert()
+    
+    with _converter(sample_pdf, tmp_path, use_cache=False) as conv:
+        conv.max_workers = 2
+        assert conv.convert() == markdown
+
+
+def test_fingerprint_is_only_computed_when_caching(sample_pdf, tmp_path):
+    with _converter(sample_pdf, tmp_path, use_cache=False) as conv:
+        conv.convert()
+        assert conv._fingerprint is None
+    
+    with _converter(sample_pdf, tmp_path) as conv:
+        assert conv._fingerprint is None
+        conv.convert()
+        assert conv.cache_path.name.startswith(conv._fingerprint)
@@ -0,0 +1,162 @@
+"""
+Tests for the rectangle and table detectors.
+"""
+
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import numpy as np
+import pytest
+
+from pdf_layout_markdown.detectors import BaseDetector, RectangleDetector, TableDetector
+from pdf_layout_markdown.models import Rectangle
+from pdf_layout_markdown.renderers import PageRenderer
+
+# Pixels a detected coordinate may move by when detection runs at factor 2
+TOLERANCE = 3
+
+
+@pytest.fixture
+def page_image(sample_pdf):
+    with fitz.open(sample_pdf) as doc:
+        return PageRenderer(dpi=300).render(doc[0])
+
+
+def _naive_cluster_positions(positions, threshold):
+    positions = sorted(positions)
+    clusters = [[positions[0]]]
+    for pos in positions[1:]:
+        if pos - clusters[-1][-1] < threshold:
+            clusters[-1].append(pos)
+        else:
+            clusters.append([pos])
+    return [int(np.mean(c)) for c in clusters]
+
+
+def _close(a, b, tolerance=TOLERANCE):
+    return len(a) == len(b) and all(abs(x - y) <= tolerance for x, y in zip(a, b))
+
+
+def test_downscale_is_opt_in():
+    assert RectangleDetector().downscale_factor == 1
+    assert TableDetector().downscale_factor == 1
+    assert TableDetector(downscale_factor=0).downscale_factor == 1
+    assert TableDetector(downscale_factor="auto").downscale_factor == "auto"
+
+
+def test_downscaled_grid_lines_match_full_resolution(page_image):
+    h_full, v_full = TableDetector().detect_grid_lines(page_image)
+    h_half, v_half = TableDetector(downscale_factor=2).detect_grid_lines(page_image)
+    
+    assert h_full and v_full
+    assert _close(h_half, h_full)
+    assert _close(v_half, v_full)
+
+
+def test_downscaled_rectangles_match_full_resolution(page_image):
+    key = lambda r: (r.y, r.x)
+    full = sorted(RectangleDetector().detect(page_image), key=key)
+    half = sorted(RectangleDetector(downscale_factor=2).detect(page_image), key=key)
+    
+    assert full
+    assert len(half) == len(full)
+    for a, b in zip(half, full):
+        assert _close((a.x, a.y, a.x2, a.y2), (b.x, b.y, b.x2, b.y2))
+
+
+@pytest.mark.parametrize("threshold", [1, 5, 15])
+def test_cluster_positions_matches_sequential_grouping(threshold):
+    rng = np.random.default_rng(threshold)
+    for _ in range(50):
+        positions = rng.integers(0, 2000, rng.integers(1, 80)).tolist()
+        expected = _naive_cluster_positions(positions, threshold)
+        assert BaseDetector.cluster_positions(positions, threshold) == expected
+        assert BaseDetector.cluster_positions(np.array(positions), threshold) == expected
+    
+    assert BaseDetector.cluster_positions([], threshold) == []
+
+
+def _random_hierarchy(rng, count):
+    # Parents come earlier in a random order, so the tree has no cycles
+    order = rng.permutation(count)
+    parents = np.full(count, -1)
+    for pos in range(1, count):
+        if rng.random() < 0.8:
+            parents[order[pos]] = order[rng.integers(0, pos)]
+    hierarchy = np.full((1, count, 4), -1, dtype=np.int32)
+    hierarchy[0, :, 3] = parents
+    return hierarchy
+
+
+def test_hierarchy_levels_match_parent_walk():
+    rng = np.random.default_rng(0)
+    for count in (1, 2, 10, 200):
+        hierarchy = _random_hierarchy(rng, count)
+        expected = []
+        for i in range(count):
+            level, parent = 0, hierarchy[0][i][3]
+            while parent != -1:
+                level += 1
+                parent = hierarchy[0][parent][3]
+            expected.append(level)
+        
+        assert RectangleDetector._hierarchy_levels(hierarchy, count) == expected
+    
+    assert RectangleDetector._hierarchy_levels(None, 3) == [0, 0, 0]
+
+
+def _random_rects(rng, count):
+    return [Rectangle(int(x), int(y), int(w), int(h))
+            for x, y, w, h in zip(rng.integers(0, 300, count), rng.integers(0, 300, count),
+                                  rng.integers(1, 150, count), rng.integers(1, 150, count))]
+
+
+def test_drop_duplicates_matches_sequential_check():
+    def is_duplicate(rect, existing, threshold=0.5):
+        for other in existing:
+            overlap_x = max(0, min(rect.x2, other.x2) - max(rect.x, other.x))
+            overlap_y = max(0, min(rect.y2, other.y2) - max(rect.y, other.y))
+            if overlap_x * overlap_y > threshold * min(rect.area, other.area):
+                return True
+        return False
+    
+    detector = RectangleDetector()
+    rng = np.random.default_rng(0)
+    for n_existing, n_candidates in [(0, 0), (0, 20), (5, 0), (10, 30), (40, 40)]:
+        existing = _random_rects(rng, n_existing)
+        candidates = _random_rects(rng, n_candidates)
+        
+        expected = list(existing)
+        for rect in candidates:
+            if not is_duplicate(rect, expected):
+                expected.append(rect)
+        
+        kept = detector._drop_duplicates(candidates, existing)
+        assert [id(r) for r in existing + kept] == [id(r) for r in expected]
+
+
+def test_scratch_buffers_are_per_thread():
+    detector = TableDetector()
+    mine = detector.scratch("h", (4, 4))
+    assert detector.scratch("h", (4, 4)) is mine
+    
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        theirs = pool.submit(detector.scratch, "h", (4, 4)).result()
+    assert theirs is not mine
+    
+    assert "_scratch_buffers" not in pickle.loads(pickle.dumps(detector)).__dict__
+
+
+def test_cuda_failure_falls_back_to_cpu(page_image, monkeypatch):
+    expected = TableDetector().detect_grid_lines(page_image)
+    detector = TableDetector()
+    detector.use_cuda = True
+    
+    def missing_helper(gray):
+        raise AttributeError("module 'cv2.cuda' has no attribute 'createCannyEdgeDetector'")
+    
+    monkeypatch.setattr(detector, "_grid_projections_cuda", missing_helper)
+    
+    assert detector.detect_grid_lines(page_image) == expected
+    assert detector.use_cuda is False
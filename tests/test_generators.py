@@ -0,0 +1,50 @@
+"""
+Tests for the markdown generators.
+"""
+
+from pdf_layout_markdown.generators import FixedFormatGenerator, StructuredMarkdownGenerator
+from pdf_layout_markdown.models import TextBox
+
+
+def test_table_cells_are_html_escaped():
+    boxes = [
+        TextBox(10, 10, 80, 20, "Item"),
+        TextBox(200, 10, 80, 20, "Qty"),
+        TextBox(10, 60, 80, 20, "Inspection & Survey <Ltd>"),
+        TextBox(200, 60, 80, 20, "3 > 2"),
+        TextBox(10, 110, 80, 20, '"quoted"'),
+    ]
+    
+    table = FixedFormatGenerator()._generate_table(boxes)
+    
+    assert table == (
+        "<table>\n"
+        "  <thead>\n"
+        "    <tr>\n"
+        "      <th>Item</th>\n"
+        "      <th>Qty</th>\n"
+        "    </tr>\n"
+        "  </thead>\n"
+        "  <tbody>\n"
+        "    <tr>\n"
+        "      <td>Inspection &amp; Survey &lt;Ltd&gt;</td>\n"
+        "      <td>3 &gt; 2</td>\n"
+        "    </tr>\n"
+        "    <tr>\n"
+        "      <td>\"quoted\"</td>\n"
+        "      <td></td>\n"
+        "    </tr>\n"
+        "  </tbody>\n"
+        "</table>"
+    )
+
+
+def test_key_value_map_ignores_reused_box_ids():
+    generator = StructuredMarkdownGenerator()
+    old = TextBox(10, 10, 80, 20, "Old: value")
+    box = TextBox(10, 10, 80, 20, "Invoice No: 42")
+    generator._start_page([box])
+    # Simulate a freed box whose id now belongs to `box`
+    generator._kv_map[id(box)] = (old, "**Old:** value")
+    
+    assert generator._generate_structured_text([box]) == "**Invoice No:** 42"
@@ -0,0 +1,46 @@
+"""
+Tests for MergeProcessor.
+"""
+
+import numpy as np
+
+from pdf_layout_markdown.models import Rectangle
+from pdf_layout_markdown.postprocessors import MergeProcessor
+
+
+def _naive_should_merge(a: Rectangle, b: Rectangle, max_gap: int) -> bool:
+    x_overlap = min(a.x2, b.x2) - max(a.x, b.x)
+    y_overlap = min(a.y2, b.y2) - max(a.y, b.y)
+    v_gap = max(a.y, b.y) - min(a.y2, b.y2)
+    h_gap = max(a.x, b.x) - min(a.x2, b.x2)
+    return ((x_overlap > min(a.width, b.width) * 0.5 and v_gap < max_gap) or
+            (y_overlap > min(a.height, b.height) * 0.5 and h_gap < max_gap))
+
+
+def test_chain_merges_into_one_group():
+    # a-b and b-c are within max_gap; a-c is not, so only chaining joins them
+    a = Rectangle(0, 0, 100, 50, level=2)
+    far = Rectangle(500, 500, 50, 50, level=5)
+    c = Rectangle(0, 120, 100, 50, level=1)
+    b = Rectangle(0, 60, 100, 50, level=3)
+    processor = MergeProcessor(max_gap=20)
+    
+    assert not _naive_should_merge(a, c, 20)
+    merged = processor.process([a, far, c, b])
+    
+    assert [(r.x, r.y, r.width, r.height) for r in merged] == [(0, 0, 100, 170), (500, 500, 50, 50)]
+    # The group takes the level of its lowest-index member
+    assert [r.level for r in merged] == [2, 5]
+
+
+def test_merge_matrix_matches_pairwise_rule():
+    rng = np.random.default_rng(0)
+    rects = [Rectangle(int(x), int(y), int(w), int(h))
+             for x, y, w, h in zip(rng.integers(0, 400, 60), rng.integers(0, 400, 60),
+                                   rng.integers(5, 120, 60), rng.integers(5, 120, 60))]
+    coords = np.array([(r.x, r.y, r.x2, r.y2) for r in rects], dtype=np.int64)
+    
+    matrix = MergeProcessor._merge_matrix(coords, 20)
+    
+    expected = [[_naive_should_merge(a, b, 20) for b in rects] for a in rects]
+    assert matrix.tolist() == expected
@@ -0,0 +1,61 @@
+"""
+Tests for the TextBox and Rectangle models.
+"""
+
+import pickle
+from dataclasses import asdict, replace
+
+import pytest
+
+from pdf_layout_markdown.models import Rectangle, TextBox
+
+
+@pytest.mark.parametrize("make", [
+    lambda: Rectangle(0, 0, 10, 10, 0),
+    lambda: TextBox(0, 0, 10, 10, "text"),
+])
+def test_metadata_defaults_empty_and_is_writable(make):
+    item = make()
+    assert item.metadata == {}
+    assert item.to_dict()["metadata"] == {}
+    
+    item.metadata["k"] = 1
+    assert item.metadata == {"k": 1}
+    assert item.to_dict()["metadata"] == {"k": 1}
+    # Each instance gets its own dict
+    assert make().metadata == {}
+
+
+@pytest.mark.parametrize("item", [
+    Rectangle(1, 2, 3, 4, 1, "table_cell", {"row": 0}),
+    TextBox(1, 2, 3, 4, "text", 9.0, {"font": "Helvetica"}),
+])
+def test_round_trips(item):
+    assert type(item).from_dict(item.to_dict()) == item
+    assert pickle.loads(pickle.dumps(item)) == item
+
+
+def test_rectangle_copies_metadata():
+    a = Rectangle(0, 0, 10, 10, metadata={"a": 1})
+    b = Rectangle(5, 5, 10, 10, metadata={"b": 2})
+    merged = a.merge_with(b)
+    assert (merged.x, merged.y, merged.width, merged.height) == (0, 0, 15, 15)
+    assert merged.metadata == {"a": 1, "b": 2}
+    
+    expanded = a.expand(2)
+    expanded.metadata["c"] = 3
+    assert a.metadata == {"a": 1}
+
+
+@pytest.mark.parametrize("item", [
+    Rectangle(1, 2, 3, 4, 1, "table_cell", {"row": 0}),
+    TextBox(1, 2, 3, 4, "text", 9.0, {"font": "Helvetica"}),
+])
+def test_dataclass_helpers_round_trip(item):
+    assert asdict(item) == item.to_dict()
+    assert type(item)(**asdict(item)) == item
+    
+    moved = replace(item, x=10)
+    assert moved.x == 10
+    assert moved.metadata == item.metadata
+    assert replace(moved, x=item.x) == item
@@ -0,0 +1,73 @@
+"""
+Tests for PageAnalyzer and PageAnalysisResult.
+"""
+
+import fitz
+import numpy as np
+
+from pdf_layout_markdown.analyzers import PageAnalyzer
+from pdf_layout_markdown.analyzers.page_analyzer import PageAnalysisResult
+from pdf_layout_markdown.models import Rectangle, TextBox
+
+BASE_KEYS = ["rectangles", "cells", "cell_text", "h_lines", "v_lines",
+             "text_boxes", "uncategorized", "dimensions"]
+
+
+def _boxes_and_cells():
+    cells = [Rectangle(0, 0, 100, 50), Rectangle(100, 0, 100, 50)]
+    boxes = [TextBox(10, 10, 20, 10, "a"), TextBox(110, 10, 20, 10, "b"), TextBox(300, 300, 5, 5, "c")]
+    return cells, boxes
+
+
+def test_to_dict_keys_match_original_layout():
+    result = PageAnalysisResult()
+    assert list(result.to_dict()) == BASE_KEYS
+    assert list(result.to_dict(include_cell_text=False)) == [k for k in BASE_KEYS if k != "cell_text"]
+
+
+def test_cell_text_keyword_is_accepted():
+    cells, boxes = _boxes_and_cells()
+    cell_text = {0: [boxes[0]], 1: [boxes[1]]}
+    result = PageAnalysisResult(cells=cells, cell_text=cell_text, text_boxes=boxes)
+    assert result.cell_text is cell_text
+    assert result.to_dict()["cell_text"] is cell_text
+    assert result.cell_box_pairs.tolist() == [[0, 0], [1, 1]]
+
+
+def test_cell_text_built_from_pairs():
+    cells, boxes = _boxes_and_cells()
+    pairs = np.array([[0, 0], [1, 1]], dtype=np.int32)
+    result = PageAnalysisResult(cells=cells, text_boxes=boxes, cell_box_pairs=pairs)
+    assert result.cell_text == {0: [boxes[0]], 1: [boxes[1]]}
+    assert result == PageAnalysisResult(cells=cells, text_boxes=boxes,
+                                        cell_text={0: [boxes[0]], 1: [boxes[1]]})
+
+
+def test_analyzer_maps_text_to_cells(sample_pdf):
+    with fitz.open(sample_pdf) as doc:
+        result = PageAnalyzer(dpi=100).analyze(doc[0])
+    
+    assert result.cells and result.text_boxes
+    # Same assignment as checking every (cell, box) pair directly
+    expected = {
+        i: [b for b in result.text_boxes
+            if b.x >= c.x and b.y >= c.y and b.x2 <= c.x2 and b.y2 <= c.y2]
+        for i, c in enumerate(result.cells)
+    }
+    assert result.cell_text == expected
+    in_cells = {id(b) for boxes in expected.values() for b in boxes}
+    assert result.uncategorized == [b for b in result.text_boxes if id(b) not in in_cells]
+
+
+def test_close_shuts_down_detector_threads(sample_pdf):
+    analyzer = PageAnalyzer(dpi=100, parallel_detectors=True)
+    with fitz.open(sample_pdf) as doc:
+        analyzer.analyze(doc[0])
+    pool = analyzer._detector_pool
+    assert pool is not None
+    
+    analyzer.close()
+    
+    assert analyzer._detector_pool is None
+    assert all(not thread.is_alive() for thread in pool._threads)
+    analyzer.close()